@@ -1,6 +1,7 @@
 import streamlit as st
 import sys
 import os
+import uuid
 from pathlib import Path
 
 # Add src to Python path
@@ -14,6 +15,9 @@ if hasattr(st, 'secrets'):
 
 # Now import (after path is set)
 from rag_pipeline import RAGPipeline
+from prompts import MARK_MODES
+import metrics
+import profiling
 
 st.set_page_config(
     page_title="RGPV RAG Assistant",
@@ -26,8 +30,14 @@ st.set_page_config(
 # Initialize RAG pipeline (cached)
 @st.cache_resource
 def load_pipeline():
+    # Optional Prometheus endpoint (once per process)
+    metrics_port = os.getenv("RAG_METRICS_PORT")
+    if metrics_port:
+        metrics.start_http_server(int(metrics_port))
+    
     try:
-        return RAGPipeline()
+        # Lazy: models load in the background while the UI renders
+        return RAGPipeline(lazy=True, warm_up=True)
     except Exception as e:
         st.error(f"Failed to initialize pipeline: {e}")
         return None
@@ -36,11 +46,39 @@ def load_pipeline():
 st.title("📚 RGPV Study Assistant")
 st.markdown("Ask questions from your study material - Get exam-ready answers")
 
+# Main area
+pipeline = load_pipeline()
+
+if pipeline is None:
+    st.error("❌ Failed to load RAG pipeline. Check console for errors.")
+    st.stop()
+
+# Conversation per browser session, so follow-ups ("give an example")
+# reuse the previous question's context
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+    st.session_state.topic = None
+
+# Read from index files - does not wait for the model to load
+index_info = pipeline.index_info()
+metric = index_info['metric']
+subjects = index_info['subjects']
+
 # Sidebar
 with st.sidebar:
     st.header("⚙️ Settings")
-    top_k = st.slider("Number of sources", 1, 5, 3)
-    threshold = st.slider("Relevance threshold", 0.5, 2.0, 1.5, 0.1)
+    subject_choice = st.selectbox("Subject", ["All subjects"] + subjects)
+    subject = None if subject_choice == "All subjects" else subject_choice
+    marks = st.selectbox(
+        "Answer type", sorted(MARK_MODES), index=sorted(MARK_MODES).index(5),
+        format_func=lambda m: f"{m} marks"
+    )
+    # Default follows the answer type; keyed per mode so it resets on change
+    top_k = st.slider("Number of sources", 1, 8, MARK_MODES[marks]['top_k'], key=f"top_k_{marks}")
+    if metric == "cosine":
+        threshold = st.slider("Minimum similarity", 0.0, 1.0, 0.3, 0.05)
+    else:
+        threshold = st.slider("Max distance (legacy L2 index)", 0.5, 2.0, 1.5, 0.1)
     
     st.markdown("---")
     st.markdown("**How to use:**")
@@ -48,24 +86,71 @@ with st.sidebar:
     st.markdown("2. Click 'Get Answer'")
     st.markdown("3. View answer + sources")
     
+    st.markdown("---")
+    if st.session_state.topic:
+        st.markdown(f"**Current topic:** {st.session_state.topic}")
+        if st.button("🆕 New topic"):
+            pipeline.end_session(st.session_state.session_id)
+            st.session_state.session_id = uuid.uuid4().hex
+            st.session_state.topic = None
+            st.rerun()
+    
+    st.markdown("---")
+    show_debug = st.checkbox("🛠️ Show debug timings", value=False)
+    
     st.markdown("---")
     st.info("💡 Try asking:\n- 'Previous year questions of data structure'\n- 'What is recursion?'")
 
-# Main area
-pipeline = load_pipeline()
-
-if pipeline is None:
-    st.error("❌ Failed to load RAG pipeline. Check console for errors.")
-    st.stop()
-
 # Question input
 query = st.text_input("🔍 Enter your question:", placeholder="e.g., What are previous year questions of data structure?")
 
+# Follow-ups are explicit in the UI, never guessed from the wording
+follow_up = False
+if st.session_state.topic:
+    follow_up = st.checkbox(f"↪️ Follow-up on: {st.session_state.topic}", value=False)
+
 if st.button("Get Answer", type="primary"):
     if query.strip():
         with st.spinner("🔍 Searching knowledge base..."):
             try:
-                result = pipeline.answer_question(query, top_k=top_k, score_threshold=threshold)
+                # With RAG_PROFILE_QUERY=1, open the app with ?profile=1
+                # to profile every answer
+                result = pipeline.answer_question(
+                    query, top_k=top_k, score_threshold=threshold, subject=subject, marks=marks,
+                    profile=profiling.query_flag_allowed() and st.query_params.get("profile") == "1",
+                    session_id=st.session_state.session_id,
+                    follow_up=follow_up
+                )
+                
+                if result.get('follow_up') is False and result['found']:
+                    # A new topic was started
+                    st.session_state.topic = query
+                
+                if 'profile' in result:
+                    st.caption(f"🔬 Profile: {result['profile']['summary']}")
+                
+                # Per-stage timings for this answer
+                if show_debug:
+                    with st.expander("🛠️ Debug: where the time went", expanded=True):
+                        st.table([
+                            {'stage': stage, 'ms': round(seconds * 1000, 1)}
+                            for stage, seconds in sorted(result['timings'].items(), key=lambda kv: -kv[1])
+                        ])
+                        snapshot = metrics.dump()
+                        st.markdown("**Stage latency (all requests, ms)**")
+                        st.table([
+                            {
+                                'stage': row['labels'].get('stage', row['name']),
+                                'count': row['count'],
+                                'p50': round(row['p50'] * 1000, 1),
+                                'p95': round(row['p95'] * 1000, 1),
+                                'p99': round(row['p99'] * 1000, 1)
+                            }
+                            for row in snapshot['histograms']
+                        ])
+                        if snapshot['counters']:
+                            st.markdown("**Counters**")
+                            st.code(metrics.render_prometheus(), language="text")
                 
                 # Display results
                 if result['found']:
@@ -85,7 +170,7 @@ if st.button("Get Answer", type="primary"):
                                 st.write(source['text'])
                 else:
                     st.warning("⚠️ No relevant information found.")
-                    st.info("💡 Try:\n- Asking about 'previous year questions of data structure'\n- Rephrasing your question\n- Lowering the relevance threshold")
+                    st.info("💡 Try:\n- Asking about 'previous year questions of data structure'\n- Rephrasing your question\n- Relaxing the relevance threshold")
             
             except Exception as e:
                 st.error(f"❌ Error: {str(e)}")
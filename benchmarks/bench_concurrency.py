@@ -0,0 +1,127 @@
+"""
+Concurrent-user retrieval benchmark.
+
+Runs N threads that each call Retriever.retrieve() in a loop for a fixed
+time, at several N (default up to 40 simultaneous users), once with
+embed_query micro-batching on and once with it off. Reports QPS and
+per-request latency percentiles, so throughput collapse (QPS flat or
+falling while latency grows with N) is easy to spot.
+
+Thread budgets come from RAG_INFERENCE_THREADS / RAG_SEARCH_THREADS
+(see src/concurrency.py), so runs with different budgets can be compared.
+
+Run from the project root:
+    python benchmarks/bench_concurrency.py
+    python benchmarks/bench_concurrency.py --levels 1,10,20,40 --duration 5 --output results.json
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from bench_retrieval import percentiles, load_queries
+
+
+def run_level(retriever, texts, users: int, duration: float, top_k: int):
+    """QPS and latency with `users` threads querying for `duration` seconds."""
+    latencies = [[] for _ in range(users)]
+    errors = []
+    start_barrier = threading.Barrier(users + 1)
+    stop = threading.Event()
+
+    def user(n):
+        start_barrier.wait()
+        i = n
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                retriever.retrieve(texts[i % len(texts)], top_k=top_k)
+            except Exception as e:
+                errors.append(repr(e))
+                return
+            latencies[n].append(time.perf_counter() - start)
+            i += users
+
+    threads = [threading.Thread(target=user, args=(n,), daemon=True) for n in range(users)]
+    for t in threads:
+        t.start()
+
+    start_barrier.wait()
+    start = time.perf_counter()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    samples = [s for per_user in latencies for s in per_user]
+    return {'qps': len(samples) / elapsed, 'latency': percentiles(samples), 'errors': len(errors)}
+
+
+def bench_mode(retriever, texts, levels, duration: float, top_k: int, micro_batch: bool):
+    embedder = retriever.embedder
+    embedder.micro_batch = micro_batch
+    report = {}
+
+    for users in levels:
+        batcher = embedder._batcher
+        batches, items = (batcher.batches, batcher.items) if batcher else (0, 0)
+
+        stats = run_level(retriever, texts, users, duration, top_k)
+
+        batcher = embedder._batcher
+        if micro_batch and batcher and batcher.batches > batches:
+            stats['avg_batch'] = (batcher.items - items) / (batcher.batches - batches)
+        report[str(users)] = stats
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent-user retrieval benchmark")
+    parser.add_argument("--queries", default=str(ROOT / "benchmarks/queries_sample.jsonl"))
+    parser.add_argument("--store", default="data/processed")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--levels", default="1,5,10,20,40", help="Simultaneous users")
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per level")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    from retriever import Retriever
+
+    texts = [q['query'] for q in load_queries(args.queries)]
+    levels = [int(n) for n in args.levels.split(",")]
+    retriever = Retriever(args.store, watch_interval=0)
+
+    # Warm-up: model, FAISS and the batching worker
+    for text in texts[:5]:
+        retriever.retrieve(text, top_k=args.top_k)
+
+    print(f"👥 CONCURRENCY BENCHMARK ({len(texts)} queries, {args.duration:.0f}s per level)\n")
+    report = {
+        'store': args.store,
+        'inference_threads': os.getenv("RAG_INFERENCE_THREADS", "auto"),
+        'search_threads': os.getenv("RAG_SEARCH_THREADS", "1"),
+        'modes': {}
+    }
+    for mode, micro_batch in [("micro_batch", True), ("per_query", False)]:
+        report['modes'][mode] = bench_mode(retriever, texts, levels, args.duration, args.top_k, micro_batch)
+
+    print(f"{'Users':>6}{'batched QPS':>14}{'p95 ms':>9}{'avg batch':>11}{'per-query QPS':>16}{'p95 ms':>9}")
+    for users in map(str, levels):
+        batched = report['modes']['micro_batch'][users]
+        single = report['modes']['per_query'][users]
+        print(f"{users:>6}{batched['qps']:>14.1f}{batched['latency'].get('p95_ms', 0):>9.1f}"
+              f"{batched.get('avg_batch', 1):>11.1f}{single['qps']:>16.1f}{single['latency'].get('p95_ms', 0):>9.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
@@ -0,0 +1,120 @@
+"""
+Chunk metadata serialization benchmark: columnar format vs legacy pickle.
+
+Builds a synthetic store of N chunks (default 1M), then for each format
+measures save time, load time, random access after load, a full scan and
+size on disk, and checks the round trip is exact.
+
+Run from the project root:
+    python benchmarks/bench_documents.py
+    python benchmarks/bench_documents.py --chunks 200000 --output results.json
+"""
+import argparse
+import json
+import pickle
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from document_store import save_documents, load_documents
+
+WORDS = ("stack queue tree graph recursion pointer array hashing sorting "
+         "search node insert delete traverse algorithm complexity").split()
+
+
+def synthetic_chunks(n: int, seed: int = 0):
+    """Chunks shaped like TextSplitter output."""
+    rng = random.Random(seed)
+    subjects = [f"subject_{i}" for i in range(8)]
+    docs = []
+    for i in range(n):
+        subject = subjects[i % len(subjects)]
+        docs.append({
+            'text': " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 120))),
+            'source': f"{subject}/unit_{(i // 500) % 40}.pdf",
+            'page': (i // 5) % 400 + 1,
+            'chunk_id': i % 5 + 1,
+            'subject': subject
+        })
+    return docs
+
+
+def timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return value, time.perf_counter() - start
+
+
+def folder_mb(directory: Path, names) -> float:
+    return sum((directory / name).stat().st_size for name in names) / 1e6
+
+
+def bench_format(name: str, save, load, files, docs, directory: Path, samples: int):
+    _, save_s = timed(lambda: save(docs, directory))
+    loaded, load_s = timed(lambda: load(directory))
+
+    rng = random.Random(1)
+    picks = [rng.randrange(len(docs)) for _ in range(samples)]
+    _, access_s = timed(lambda: [loaded[i] for i in picks])
+    scanned, scan_s = timed(lambda: list(loaded))
+
+    assert scanned == docs, f"{name}: round trip mismatch"
+
+    return {
+        'save_s': save_s,
+        'load_s': load_s,
+        'random_access_us': access_s / samples * 1e6,
+        'full_scan_s': scan_s,
+        'size_mb': folder_mb(directory, files)
+    }
+
+
+def save_pickle(docs, directory: Path):
+    with open(directory / "documents.pkl", 'wb') as f:
+        pickle.dump(docs, f)
+
+
+def load_pickle(directory: Path):
+    with open(directory / "documents.pkl", 'rb') as f:
+        return pickle.load(f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Document serialization benchmark")
+    parser.add_argument("--chunks", type=int, default=1_000_000)
+    parser.add_argument("--samples", type=int, default=10_000, help="Random lookups after load")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    print(f"📦 DOCUMENT SERIALIZATION BENCHMARK ({args.chunks:,} chunks)\n")
+    docs, gen_s = timed(lambda: synthetic_chunks(args.chunks))
+    print(f"Generated synthetic chunks in {gen_s:.1f}s")
+
+    report = {'chunks': args.chunks, 'formats': {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, save, load, files in [
+            ("columnar", save_documents, load_documents,
+             ["documents.json", "documents.text", "documents.columns.npz"]),
+            ("pickle", save_pickle, load_pickle, ["documents.pkl"]),
+        ]:
+            directory = Path(tmp) / name
+            directory.mkdir()
+            report['formats'][name] = bench_format(name, save, load, files, docs, directory, args.samples)
+
+    print(f"\n{'Format':<10}{'Save s':>9}{'Load s':>9}{'Access µs':>11}{'Scan s':>9}{'MB':>9}")
+    for name, stats in report['formats'].items():
+        print(f"{name:<10}{stats['save_s']:>9.2f}{stats['load_s']:>9.2f}{stats['random_access_us']:>11.2f}"
+              f"{stats['full_scan_s']:>9.2f}{stats['size_mb']:>9.1f}")
+
+    speedup = report['formats']['pickle']['load_s'] / report['formats']['columnar']['load_s']
+    print(f"\n⚡ Columnar load is {speedup:.1f}x pickle")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results written to {args.output}")
@@ -0,0 +1,80 @@
+"""
+PDF text extraction benchmark.
+
+For every installed backend (see src/pdf_backends.py) extracts all pages
+of a PDF several times and reports pages/sec, then measures PDFLoader
+with a cold and a warm page cache.
+
+Run from the project root:
+    python benchmarks/bench_pdf.py
+    python benchmarks/bench_pdf.py --pdf data/raw/rag.pdf --rounds 10 --output results.json
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from pdf_backends import available_pdf_backends, create_pdf_backend
+from pdf_loader import PDFLoader
+
+
+def bench_backend(name: str, pdf: Path, rounds: int):
+    backend = create_pdf_backend(name)
+    pages = len(backend.extract_pages(pdf))  # warm-up
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        backend.extract_pages(pdf)
+    elapsed = time.perf_counter() - start
+
+    return {'version': backend.version, 'pages': pages, 'pages_per_s': pages * rounds / elapsed}
+
+
+def bench_cache(pdf: Path):
+    """PDFLoader on one file: first run parses, second run reads the cache."""
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp) / "raw"
+        data_dir.mkdir()
+        (data_dir / pdf.name).symlink_to(pdf.resolve())
+        cache_path = str(Path(tmp) / "pages.sqlite")
+
+        report = {}
+        for run in ("cold", "warm"):
+            with PDFLoader(str(data_dir), cache_path=cache_path) as loader:
+                start = time.perf_counter()
+                loader.load_pdfs()
+                report[f'{run}_s'] = time.perf_counter() - start
+        return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PDF extraction benchmark")
+    parser.add_argument("--pdf", default=str(ROOT / "data/raw/rag.pdf"))
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    pdf = Path(args.pdf)
+    print(f"📄 PDF EXTRACTION BENCHMARK ({pdf.name}, {args.rounds} rounds)\n")
+
+    report = {'pdf': str(pdf), 'backends': {}}
+    for name in available_pdf_backends():
+        report['backends'][name] = bench_backend(name, pdf, args.rounds)
+    report['page_cache'] = bench_cache(pdf)
+
+    print(f"\n{'Backend':<12}{'Version':<20}{'Pages':>7}{'Pages/s':>10}")
+    for name, stats in report['backends'].items():
+        print(f"{name:<12}{stats['version']:<20}{stats['pages']:>7}{stats['pages_per_s']:>10.1f}")
+    cache = report['page_cache']
+    print(f"\nPDFLoader (default backend): cold {cache['cold_s']:.3f}s, "
+          f"warm cache {cache['warm_s']:.3f}s ({cache['cold_s'] / cache['warm_s']:.1f}x)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results written to {args.output}")
@@ -0,0 +1,270 @@
+"""
+Offline retrieval benchmark.
+
+Replays a JSONL query set against a built index and reports:
+  - embed / search / end-to-end latency percentiles (LLM stubbed)
+  - QPS at several concurrency levels
+  - recall@k and MRR against labelled chunks
+  - index build time and memory per stage (optional, --build)
+
+Query file format (one JSON object per line):
+    {"query": "What is recursion?", "relevant": ["rag.pdf:1:1"]}
+where each label is "source:page:chunk_id" (see metadata_index.chunk_key).
+
+Run from the project root:
+    python benchmarks/bench_retrieval.py
+    python benchmarks/bench_retrieval.py --build --concurrency 1,4,16
+
+Results are written as JSON (default benchmarks/results/) so runs on
+different commits can be compared.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from metadata_index import chunk_key
+
+
+class StubLLM:
+    """LLMHandler stand-in: no network, fixed answer."""
+
+    def generate_answer(self, query: str, context: str, marks: int = 5) -> str:
+        return f"Stub answer for: {query}"
+
+
+def percentiles(samples_s):
+    """p50/p95/p99/mean in milliseconds."""
+    ordered = sorted(samples_s)
+    if not ordered:
+        return {}
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        'p50_ms': pick(0.50), 'p95_ms': pick(0.95), 'p99_ms': pick(0.99),
+        'mean_ms': sum(ordered) / len(ordered) * 1000, 'n': len(ordered)
+    }
+
+
+def rss_mb() -> float:
+    """Current resident memory of this process in MB."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        import resource
+        # Peak RSS (KB on Linux) when /proc is unavailable
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def load_queries(path: str):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def permissive_threshold(metric: str) -> float:
+    """Threshold that lets every candidate through (ranking-only metrics)."""
+    return -1.0 if metric == "cosine" else float("inf")
+
+
+def bench_latency(retriever, queries, top_k: int):
+    """Per-stage latency, one query at a time."""
+    from rag_pipeline import RAGPipeline
+
+    embed, search = [], []
+    for q in queries:
+        start = time.perf_counter()
+        embedding = retriever.embedder.embed_query(q['query'])
+        embed.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        retriever.search_embeddings(embedding[None, :], top_k)
+        search.append(time.perf_counter() - start)
+
+    # End-to-end through the pipeline with the LLM stubbed out
+    pipeline = RAGPipeline(lazy=True, retriever=retriever, llm=StubLLM())
+    end_to_end = []
+    for q in queries:
+        timings = pipeline.answer_question(q['query'], top_k=top_k)['timings']
+        # The demo delay is a fixed sleep, not work
+        end_to_end.append(timings['answer_total'] - timings.get('demo_delay', 0.0))
+
+    return {
+        'embed': percentiles(embed),
+        'search': percentiles(search),
+        'end_to_end': percentiles(end_to_end)
+    }
+
+
+def bench_quality(retriever, queries, ks=(1, 3, 5, 10)):
+    """recall@k and MRR over labelled queries."""
+    labelled = [q for q in queries if q.get('relevant')]
+    if not labelled:
+        return {}
+
+    max_k = max(ks)
+    results = retriever.retrieve_batch(
+        [q['query'] for q in labelled],
+        top_k=max_k,
+        score_threshold=permissive_threshold(retriever.metric)
+    )
+
+    recall = {k: 0.0 for k in ks}
+    reciprocal_rank = 0.0
+
+    for q, hits in zip(labelled, results):
+        relevant = set(q['relevant'])
+        ranked = [chunk_key(h) for h in hits]
+
+        for k in ks:
+            recall[k] += len(relevant & set(ranked[:k])) / len(relevant)
+
+        first = next((rank for rank, key in enumerate(ranked, 1) if key in relevant), None)
+        if first:
+            reciprocal_rank += 1 / first
+
+    n = len(labelled)
+    report = {f"recall@{k}": recall[k] / n for k in ks}
+    report['mrr'] = reciprocal_rank / n
+    report['n'] = n
+    return report
+
+
+def bench_throughput(retriever, queries, levels, rounds: int, top_k: int):
+    """QPS of retrieve() at each concurrency level."""
+    workload = [q['query'] for q in queries] * rounds
+    report = {}
+
+    for workers in levels:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda text: retriever.retrieve(text, top_k=top_k), workload))
+        elapsed = time.perf_counter() - start
+        report[str(workers)] = {'qps': len(workload) / elapsed, 'queries': len(workload)}
+
+    return report
+
+
+def bench_build(data_dir: str, metric: str = "cosine"):
+    """Time and memory of each index build stage (into a temp dir)."""
+    from pdf_loader import PDFLoader
+    from text_splitter import TextSplitter
+    from embedder import Embedder
+    from vector_store_builder import VectorStore
+    from dedup import deduplicate_chunks
+
+    stages = {}
+    tracemalloc.start()
+
+    def run(name, fn):
+        rss_before = rss_mb()
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        value = fn()
+        stages[name] = {
+            'seconds': time.perf_counter() - start,
+            'rss_delta_mb': rss_mb() - rss_before,
+            'python_peak_mb': tracemalloc.get_traced_memory()[1] / 1e6
+        }
+        return value
+
+    with PDFLoader(data_dir) as loader:
+        docs = run("load", loader.load_pdfs)
+    chunks = run("split", lambda: TextSplitter().split_documents(docs))
+    split_count = len(chunks)
+    chunks = run("dedup", lambda: deduplicate_chunks(chunks))
+    embedder = run("model_load", lambda: Embedder(normalize=(metric == "cosine")))
+    embeddings = run("embed", lambda: embedder.embed_documents([c['text'] for c in chunks]))
+
+    def add():
+        store = VectorStore(dimension=embeddings.shape[1], metric=metric)
+        store.add_documents(embeddings, chunks)
+        with tempfile.TemporaryDirectory() as tmp:
+            store.save(tmp)
+        return store
+
+    run("add", add)
+    tracemalloc.stop()
+
+    return {'pages': len(docs), 'chunks_split': split_count, 'chunks': len(chunks), 'stages': stages}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline retrieval benchmark")
+    parser.add_argument("--queries", default=str(ROOT / "benchmarks/queries_sample.jsonl"))
+    parser.add_argument("--store", default="data/processed")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--concurrency", default="1,2,4,8")
+    parser.add_argument("--rounds", type=int, default=5, help="Query set repeats for QPS")
+    parser.add_argument("--build", action="store_true", help="Also benchmark index build")
+    parser.add_argument("--data-dir", default="data/raw")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    from retriever import Retriever
+
+    queries = load_queries(args.queries)
+    print(f"⏱️  RETRIEVAL BENCHMARK ({len(queries)} queries, store={args.store})\n")
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    retriever = Retriever(args.store)
+    retriever_load_s = time.perf_counter() - start
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'store': args.store,
+        'metric': retriever.metric,
+        'top_k': args.top_k,
+        'retriever_load': {'seconds': retriever_load_s, 'rss_delta_mb': rss_mb() - rss_before},
+        'latency': bench_latency(retriever, queries, args.top_k),
+        'quality': bench_quality(retriever, queries),
+        'throughput': bench_throughput(
+            retriever, queries, [int(c) for c in args.concurrency.split(",")],
+            args.rounds, args.top_k
+        )
+    }
+
+    if args.build:
+        report['build'] = bench_build(args.data_dir, retriever.metric)
+
+    # Summary
+    for stage, stats in report['latency'].items():
+        print(f"{stage:<12} p50 {stats['p50_ms']:8.2f} ms   p95 {stats['p95_ms']:8.2f} ms   p99 {stats['p99_ms']:8.2f} ms")
+    for workers, stats in report['throughput'].items():
+        print(f"concurrency {workers:>3}: {stats['qps']:8.1f} QPS")
+    for metric, value in report['quality'].items():
+        print(f"{metric:<10} {value:.3f}" if isinstance(value, float) else f"{metric:<10} {value}")
+    if 'build' in report:
+        for stage, stats in report['build']['stages'].items():
+            print(f"build {stage:<11} {stats['seconds']:8.2f} s   RSS {stats['rss_delta_mb']:+8.1f} MB")
+
+    output = Path(args.output or ROOT / f"benchmarks/results/retrieval-{report['commit']}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results written to {output}")
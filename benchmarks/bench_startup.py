@@ -0,0 +1,68 @@
+"""
+Startup benchmark: import time, pipeline construction and first-query
+latency for eager vs lazy RAGPipeline initialization.
+
+Each measurement runs in a fresh interpreter so module caches do not
+hide import cost.
+
+Run from the project root:
+    python benchmarks/bench_startup.py
+"""
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Runs inside a fresh interpreter, prints one JSON line
+PROBE = r"""
+import json, sys, time, contextlib, io
+sys.path.insert(0, "src")
+
+t0 = time.perf_counter()
+from rag_pipeline import RAGPipeline
+t_import = time.perf_counter() - t0
+
+with contextlib.redirect_stdout(io.StringIO()):
+    t0 = time.perf_counter()
+    pipeline = RAGPipeline(lazy={lazy})
+    t_init = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    pipeline.answer_question({query!r})
+    t_first = time.perf_counter() - t0
+
+print(json.dumps({{'import_s': t_import, 'init_s': t_init, 'first_query_s': t_first}}))
+"""
+
+CASES = [
+    ("eager", False, "previous year question of data structure"),
+    ("lazy", True, "previous year question of data structure"),
+    ("eager", False, "What is recursion?"),
+    ("lazy", True, "What is recursion?"),
+]
+
+
+def run_case(lazy: bool, query: str) -> dict:
+    """Run one probe in a fresh interpreter."""
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(lazy=lazy, query=query)],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    print("⏱️  STARTUP BENCHMARK\n")
+    print(f"{'Mode':<7}{'Query':<44}{'Import s':>10}{'Init s':>10}{'1st query s':>13}{'Ready s':>10}")
+    print("-" * 94)
+
+    for mode, lazy, query in CASES:
+        stats = run_case(lazy, query)
+        first = stats['first_query_s']
+        # Time until the UI can render (import + construction)
+        ready = stats['import_s'] + stats['init_s']
+        print(f"{mode:<7}{query[:42]:<44}{stats['import_s']:>10.3f}"
+              f"{stats['init_s']:>10.3f}{first:>13.3f}{ready:>10.3f}")
+
@@ -0,0 +1,219 @@
+"""
+Local Groq/OpenAI-compatible chat completions server for load tests.
+
+Serves POST /openai/v1/chat/completions (Groq SDK path) and
+POST /v1/chat/completions (OpenAI path), with:
+  - configurable latency distribution (lognormal around a median)
+  - token generation rate, streamed as SSE when "stream": true
+  - random 429 injection with a Retry-After header
+GET /stats returns request / 429 / token counters.
+
+Point LLMHandler at it with:
+    GROQ_BASE_URL=http://127.0.0.1:8900 GROQ_API_KEY=fake
+
+Run standalone:
+    python benchmarks/fake_groq_server.py --port 8900 --latency-ms 400 --rate-limit 0.1
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Words used to build fake completions
+FILLER = ("recursion stack queue tree graph sorting hashing pointer node array "
+          "algorithm complexity memory search insert delete traverse").split()
+
+
+class FakeGroqConfig:
+    """Behaviour knobs, shared by all handler threads."""
+
+    def __init__(
+        self,
+        latency_ms: float = 300.0,
+        latency_sigma: float = 0.5,
+        tokens_per_sec: float = 250.0,
+        completion_tokens: int = 150,
+        rate_limit: float = 0.0,
+        retry_after_s: float = 1.0
+    ):
+        """
+        Args:
+            latency_ms: Median time to first token
+            latency_sigma: Lognormal sigma (0 = fixed latency)
+            tokens_per_sec: Generation rate after the first token
+            completion_tokens: Tokens per answer (capped by max_tokens)
+            rate_limit: Probability of answering 429
+            retry_after_s: Retry-After header on 429 responses
+        """
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.tokens_per_sec = tokens_per_sec
+        self.completion_tokens = completion_tokens
+        self.rate_limit = rate_limit
+        self.retry_after_s = retry_after_s
+
+        self.stats = {'requests': 0, 'rate_limited': 0, 'completed': 0, 'tokens': 0}
+        self._lock = threading.Lock()
+
+    def count(self, key: str, value: int = 1):
+        with self._lock:
+            self.stats[key] += value
+
+    def first_token_delay(self) -> float:
+        if self.latency_sigma <= 0:
+            return self.latency_ms / 1000
+        return random.lognormvariate(0, self.latency_sigma) * self.latency_ms / 1000
+
+
+def _make_handler(config: FakeGroqConfig):
+
+    class FakeGroqHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, status: int, payload: dict, headers: dict = None):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                self._send_json(200, dict(config.stats))
+            else:
+                self._send_json(404, {'error': {'message': 'not found'}})
+
+        def do_POST(self):
+            if not self.path.endswith("/chat/completions"):
+                self._send_json(404, {'error': {'message': 'not found'}})
+                return
+
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            config.count('requests')
+
+            if random.random() < config.rate_limit:
+                config.count('rate_limited')
+                self._send_json(
+                    429,
+                    {'error': {'message': 'Rate limit reached (fake server)', 'type': 'tokens', 'code': 'rate_limit_exceeded'}},
+                    {'Retry-After': f"{config.retry_after_s:g}"}
+                )
+                return
+
+            n_tokens = min(config.completion_tokens, request.get('max_tokens') or config.completion_tokens)
+            words = [random.choice(FILLER) for _ in range(n_tokens)]
+            time.sleep(config.first_token_delay())
+
+            if request.get('stream'):
+                self._stream(request, words)
+            else:
+                time.sleep(n_tokens / config.tokens_per_sec)
+                self._send_json(200, self._completion(request, " ".join(words), n_tokens))
+
+            config.count('completed')
+            config.count('tokens', n_tokens)
+
+        def _completion(self, request: dict, text: str, n_tokens: int) -> dict:
+            prompt_tokens = sum(len(m.get('content', '').split()) for m in request.get('messages', []))
+            return {
+                'id': f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': request.get('model', 'fake'),
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': text},
+                    'finish_reason': 'stop'
+                }],
+                'usage': {
+                    'prompt_tokens': prompt_tokens,
+                    'completion_tokens': n_tokens,
+                    'total_tokens': prompt_tokens + n_tokens
+                }
+            }
+
+        def _stream(self, request: dict, words):
+            """Server-sent events, one token per chunk at tokens_per_sec."""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            chunk_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+            def send(data: str):
+                payload = f"data: {data}\n\n".encode('utf-8')
+                self.wfile.write(f"{len(payload):X}\r\n".encode() + payload + b"\r\n")
+                self.wfile.flush()
+
+            for i, word in enumerate(words):
+                delta = {'content': (" " if i else "") + word}
+                if i == 0:
+                    delta['role'] = 'assistant'
+                send(json.dumps({
+                    'id': chunk_id, 'object': 'chat.completion.chunk',
+                    'created': int(time.time()), 'model': request.get('model', 'fake'),
+                    'choices': [{'index': 0, 'delta': delta, 'finish_reason': None}]
+                }))
+                time.sleep(1 / config.tokens_per_sec)
+
+            send(json.dumps({
+                'id': chunk_id, 'object': 'chat.completion.chunk',
+                'created': int(time.time()), 'model': request.get('model', 'fake'),
+                'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]
+            }))
+            send("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeGroqHandler
+
+
+def start_fake_groq(config: FakeGroqConfig = None, host: str = "127.0.0.1", port: int = 0):
+    """
+    Start the fake server in a background thread.
+
+    Returns:
+        (server, base_url) - pass base_url as GROQ_BASE_URL
+    """
+    config = config or FakeGroqConfig()
+    server = ThreadingHTTPServer((host, port), _make_handler(config))
+    server.daemon_threads = True
+    server.config = config
+    threading.Thread(target=server.serve_forever, name="fake-groq", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Groq server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--tokens-per-sec", type=float, default=250.0)
+    parser.add_argument("--completion-tokens", type=int, default=150)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="429 probability")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    args = parser.parse_args()
+
+    config = FakeGroqConfig(
+        args.latency_ms, args.latency_sigma, args.tokens_per_sec,
+        args.completion_tokens, args.rate_limit, args.retry_after
+    )
+    server, url = start_fake_groq(config, args.host, args.port)
+    print(f"🤖 Fake Groq server on {url} (GROQ_BASE_URL={url})")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
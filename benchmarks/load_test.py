@@ -0,0 +1,167 @@
+"""
+Load test for RAGPipeline.answer_question against a local fake Groq.
+
+Requests arrive as a Poisson process at each target rate (open loop,
+so slow responses do not slow down arrivals). Reports throughput, tail
+latency, LLM retries, 429s seen by the server and error rate.
+
+Run from the project root:
+    python benchmarks/load_test.py --rates 2,5,10 --duration 20 --rate-limit 0.1
+    python benchmarks/load_test.py --real-retriever        # use data/processed
+
+By default the retriever is stubbed so only the LLM path is loaded.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+import metrics
+from fake_groq_server import FakeGroqConfig, start_fake_groq
+
+QUESTIONS = [
+    "What is recursion? Explain with example.",
+    "Differentiate between stack and queue.",
+    "Explain shell sort algorithm.",
+    "How is a binary search tree traversed?",
+    "What is hashing?",
+    "Explain multiway merge sort with an example.",
+]
+
+
+class StubRetriever:
+    """Fixed chunks, no model or index (isolates the LLM path)."""
+
+    metric = "cosine"
+
+    def retrieve(self, query, top_k=3, score_threshold=None, **filters):
+        return [
+            {'text': f"Study material chunk {i} about {query}", 'source': 'stub.pdf',
+             'page': i, 'chunk_id': 1, 'score': 0.9 - i * 0.1, 'id': i}
+            for i in range(top_k)
+        ]
+
+    def list_subjects(self):
+        return []
+
+
+def counter_value(name: str) -> float:
+    return sum(row['value'] for row in metrics.dump()['counters'] if row['name'] == name)
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def run_rate(pipeline, rate: float, duration: float, workers: int):
+    """Drive the pipeline at one arrival rate; returns a stats dict."""
+    latencies, errors = [], []
+    lock = threading.Lock()
+    retries_before = counter_value("rag_llm_retries_total")
+
+    def one_request(question: str):
+        result = pipeline.answer_question(question)
+        timings = result['timings']
+        # The demo delay is a fixed sleep, not load-dependent work
+        latency = timings['answer_total'] - timings.get('demo_delay', 0.0)
+        with lock:
+            latencies.append(latency)
+            errors.append(result['answer'].startswith("❌") or not result['found'])
+
+    start = time.perf_counter()
+    sent = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        next_arrival = start
+        while next_arrival - start < duration:
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(one_request, random.choice(QUESTIONS))
+            sent += 1
+            next_arrival += random.expovariate(rate)
+    elapsed = time.perf_counter() - start
+
+    ordered = sorted(latencies)
+    return {
+        'target_rps': rate,
+        'sent': sent,
+        'completed': len(latencies),
+        'throughput_rps': len(latencies) / elapsed,
+        'p50_s': percentile(ordered, 0.50),
+        'p95_s': percentile(ordered, 0.95),
+        'p99_s': percentile(ordered, 0.99),
+        'max_s': ordered[-1] if ordered else 0.0,
+        'error_rate': sum(errors) / len(errors) if errors else 0.0,
+        'llm_retries': counter_value("rag_llm_retries_total") - retries_before
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RAG pipeline load test")
+    parser.add_argument("--rates", default="2,5,10", help="Target requests/sec, comma separated")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per rate")
+    parser.add_argument("--workers", type=int, default=64, help="Max in-flight requests")
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--tokens-per-sec", type=float, default=250.0)
+    parser.add_argument("--rate-limit", type=float, default=0.05, help="429 probability")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--sdk-retries", type=int, default=0,
+                        help="Groq SDK retries (0 = only LLMHandler's own retry loop)")
+    parser.add_argument("--rpm", type=float, default=0,
+                        help="LLMHandler request budget per minute (0 = none, measure the server)")
+    parser.add_argument("--real-retriever", action="store_true")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+
+    config = FakeGroqConfig(
+        latency_ms=args.latency_ms, latency_sigma=args.latency_sigma,
+        tokens_per_sec=args.tokens_per_sec, rate_limit=args.rate_limit,
+        retry_after_s=args.retry_after
+    )
+    server, base_url = start_fake_groq(config)
+
+    # LLMHandler reads these when it creates the client
+    os.environ["GROQ_BASE_URL"] = base_url
+    os.environ["GROQ_API_KEY"] = "fake-key"
+    os.environ["GROQ_SDK_MAX_RETRIES"] = str(args.sdk_retries)
+    os.environ["LLM_REQUESTS_PER_MINUTE"] = str(args.rpm)
+
+    from rag_pipeline import RAGPipeline
+
+    retriever = None if args.real_retriever else StubRetriever()
+    pipeline = RAGPipeline(retriever=retriever)
+
+    print(f"🔥 LOAD TEST against fake Groq at {base_url}")
+    print(f"   latency {args.latency_ms:.0f} ms (sigma {args.latency_sigma}), "
+          f"{args.tokens_per_sec:.0f} tok/s, 429 rate {args.rate_limit:.0%}\n")
+    print(f"{'Target':>7}{'Sent':>7}{'Done':>7}{'RPS':>8}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}"
+          f"{'Err %':>8}{'Retries':>9}{'429s':>7}")
+
+    rows = []
+    for rate in [float(r) for r in args.rates.split(",")]:
+        limited_before = config.stats['rate_limited']
+        stats = run_rate(pipeline, rate, args.duration, args.workers)
+        stats['server_429s'] = config.stats['rate_limited'] - limited_before
+        rows.append(stats)
+        print(f"{rate:>7.1f}{stats['sent']:>7}{stats['completed']:>7}{stats['throughput_rps']:>8.2f}"
+              f"{stats['p50_s']:>8.2f}{stats['p95_s']:>8.2f}{stats['p99_s']:>8.2f}"
+              f"{stats['error_rate'] * 100:>8.1f}{stats['llm_retries']:>9.0f}{stats['server_429s']:>7}")
+
+    server.shutdown()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'config': vars(args), 'results': rows, 'server': config.stats}, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
@@ -0,0 +1,252 @@
+import hashlib
+import json
+import os
+import re
+import time
+import numpy as np
+from pathlib import Path
+from typing import List, Dict, Optional
+from metadata_index import chunk_key
+from prompts import PROMPT_VERSION, marks_mode
+from log_config import get_logger
+
+logger = get_logger("answer_bank")
+
+# Pre-generated answers to previous-year questions, served before any
+# live LLM call:
+#   entries.json    questions, answers and the chunks each answer used
+#   embeddings.npy  normalized question embeddings, one row per entry
+DEFAULT_BANK_DIR = "data/processed/answer_bank"
+ENTRIES_FILE = "entries.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+
+# "Q1", "Q8 – Write short notes on any two"
+_QUESTION_BLOCK = re.compile(r"^Q\s*(\d+)\b\s*[-–:.]?\s*(.*)$")
+# "a)", "b.", "iv)"
+_SUB_ITEM = re.compile(r"^(?:[a-h]|[ivx]{1,4})[).]\s+(.*)$", re.IGNORECASE)
+# Notes for the examiner, e.g. "(Question paper contains the graph diagram)"
+_ASIDE = re.compile(r"^\(.*\)$")
+
+
+def extract_questions(pages: List[Dict]) -> List[Dict]:
+    """
+    Questions from previous-year paper pages.
+
+    Questions are the a)/b)/i) items under "Q<n>" headings; items under
+    a "short notes" heading become "Write a short note on <item>".
+    Pages without Q<n> headings (study notes) yield nothing.
+
+    Args:
+        pages: Pages from PDFLoader
+
+    Returns:
+        [{'question', 'source', 'page'}, ...] in paper order
+    """
+    questions = []
+
+    for page in pages:
+        current, heading = None, ""
+
+        def flush():
+            if current and len(current.split()) >= 2:
+                questions.append({'question': current, 'source': page['source'], 'page': page['page']})
+
+        for raw in page['text'].splitlines():
+            line = " ".join(raw.split())
+            if not line or _ASIDE.match(line):
+                continue
+
+            block = _QUESTION_BLOCK.match(line)
+            if block:
+                flush()
+                current, heading = None, block.group(2)
+                # A heading with its own question and no sub-items
+                if heading and "short note" not in heading.lower():
+                    current = heading
+                continue
+
+            item = _SUB_ITEM.match(line)
+            if item:
+                if current != heading:
+                    flush()
+                text = item.group(1)
+                current = f"Write a short note on {text}" if "short note" in heading.lower() else text
+            elif current is not None:
+                # Wrapped line of the current question
+                current = f"{current} {line}"
+
+        flush()
+
+    return questions
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def chunk_fingerprint(chunks: List[Dict]) -> Dict[str, str]:
+    """chunk key -> content hash, for detecting changed study material."""
+    return {chunk_key(c): _text_hash(c['text']) for c in chunks}
+
+
+class AnswerBank:
+    """Question -> answer lookup by embedding similarity."""
+
+    def __init__(self, entries: List[Dict], embeddings: np.ndarray, min_similarity: float = None):
+        """
+        Args:
+            entries: Bank entries (see build_answer_bank)
+            embeddings: One question embedding per entry
+            min_similarity: Cosine similarity needed for a match
+                            (default: ANSWER_BANK_MIN_SIM env var, else 0.9)
+        """
+        self.entries = entries
+        self.embeddings = self._normalize(np.asarray(embeddings, dtype='float32').reshape(len(entries), -1))
+        self.min_similarity = min_similarity if min_similarity is not None else float(
+            os.getenv("ANSWER_BANK_MIN_SIM", "0.9")
+        )
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def match(self, query_embedding: np.ndarray, marks: int) -> Optional[Dict]:
+        """
+        Closest entry for this question and marks mode, or None.
+        Marks are compared by mode (see prompts.marks_mode): a 6-mark
+        question gets the same prompt, and answer, as a 5-mark one.
+
+        Entries written with another PROMPT_VERSION never match.
+        """
+        if not self.entries:
+            return None
+        mode = marks_mode(marks)
+
+        similarities = self.embeddings @ self._normalize(np.asarray(query_embedding, dtype='float32'))
+        for i in np.argsort(-similarities):
+            if similarities[i] < self.min_similarity:
+                return None
+            entry = self.entries[i]
+            if marks_mode(entry['marks']) == mode and entry['prompt_version'] == PROMPT_VERSION:
+                return entry
+        return None
+
+    @staticmethod
+    def is_current(entry: Dict, chunks: List[Dict]) -> bool:
+        """
+        True if every chunk the answer was generated from is still
+        retrieved for the question with the same text.
+        """
+        current = chunk_fingerprint(chunks)
+        return all(current.get(key) == digest for key, digest in entry['chunks'].items())
+
+    def save(self, directory: str = DEFAULT_BANK_DIR):
+        """Write the bank; readers see the old or the new files, never a mix."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        tmp_entries = directory / f".{ENTRIES_FILE}.tmp"
+        tmp_embeddings = directory / f".{EMBEDDINGS_FILE}.tmp"
+        with open(tmp_entries, 'w', encoding='utf-8') as f:
+            json.dump({'created': time.time(), 'entries': self.entries}, f, ensure_ascii=False, indent=1)
+        with open(tmp_embeddings, 'wb') as f:
+            np.save(f, self.embeddings, allow_pickle=False)
+
+        os.replace(tmp_embeddings, directory / EMBEDDINGS_FILE)
+        os.replace(tmp_entries, directory / ENTRIES_FILE)
+        logger.info(f"💾 Answer bank saved to {directory}/ ({len(self.entries)} entries)")
+
+    @classmethod
+    def load(cls, directory: str = DEFAULT_BANK_DIR) -> Optional["AnswerBank"]:
+        """Saved bank, or None if there is none."""
+        directory = Path(directory)
+        if not (directory / ENTRIES_FILE).exists():
+            return None
+
+        with open(directory / ENTRIES_FILE, encoding='utf-8') as f:
+            entries = json.load(f)['entries']
+        embeddings = np.load(directory / EMBEDDINGS_FILE, allow_pickle=False)
+
+        if len(embeddings) != len(entries):
+            logger.warning("⚠️ Answer bank in %s is inconsistent, ignoring it", directory)
+            return None
+
+        logger.info(f"📂 Loaded answer bank with {len(entries)} entries")
+        return cls(entries, embeddings)
+
+
+def build_answer_bank(
+    data_dir: str = "data/raw",
+    directory: str = DEFAULT_BANK_DIR,
+    marks: List[int] = (5,),
+    vector_store_path: str = "data/processed"
+) -> AnswerBank:
+    """
+    Offline job: answer every previous-year question once.
+
+    Questions are extracted from the PDFs in data_dir, answered with
+    RAGPipeline.answer_batch (full retrieve + generate path), and saved
+    with the content hash of every chunk each answer used.
+
+    Args:
+        data_dir: Folder with the PYQ PDFs
+        directory: Where to write the bank
+        marks: Marks to generate answers for (stored as their marks mode)
+        vector_store_path: Store the answers are grounded in
+    """
+    from pdf_loader import PDFLoader
+    from rag_pipeline import RAGPipeline
+
+    with PDFLoader(data_dir) as loader:
+        questions = extract_questions(loader.load_pdfs())
+    texts = list(dict.fromkeys(q['question'] for q in questions))
+    origin = {q['question']: q for q in questions}
+    logger.info(f"❓ Extracted {len(texts)} questions from {data_dir}/")
+
+    pipeline = RAGPipeline(vector_store_path=vector_store_path, answer_bank=False)
+    embeddings = pipeline.retriever.embedder.embed_queries(texts)
+
+    entries, rows = [], []
+    for mode in dict.fromkeys(marks_mode(m) for m in marks):
+        for i, result in enumerate(pipeline.answer_batch(texts, marks=mode)):
+            # Only keep real generated answers
+            if result['outcome'] != 'answered' or result['answer'].startswith("❌"):
+                logger.warning("⚠️ Skipping '%s': %s", texts[i], result['answer'][:80])
+                continue
+
+            entries.append({
+                'question': texts[i],
+                'marks': mode,
+                'answer': result['answer'],
+                'sources': result['sources'],
+                'chunks': {s['chunk_key']: _text_hash(s['text']) for s in result['sources']},
+                'prompt_version': PROMPT_VERSION,
+                'origin': {'source': origin[texts[i]]['source'], 'page': origin[texts[i]]['page']}
+            })
+            rows.append(embeddings[i])
+
+    bank = AnswerBank(entries, np.array(rows).reshape(len(rows), embeddings.shape[1]))
+    bank.save(directory)
+    return bank
+
+
+# BUILD / TEST
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "build":
+        # python src/answer_bank.py build [marks ...]
+        marks = [int(m) for m in sys.argv[2:]] or [5]
+        bank = build_answer_bank(marks=marks)
+        print(f"✅ Answer bank built: {len(bank.entries)} entries")
+    else:
+        # Show what would go into the bank
+        from pdf_loader import PDFLoader
+
+        print("🧪 EXTRACTING PREVIOUS-YEAR QUESTIONS\n")
+        with PDFLoader() as loader:
+            questions = extract_questions(loader.load_pdfs())
+        for i, q in enumerate(questions, 1):
+            print(f"{i:>3}. [{q['source']} p{q['page']}] {q['question']}")
+        print("\nRun: python src/answer_bank.py build")
@@ -0,0 +1,93 @@
+import os
+import threading
+from contextlib import contextmanager
+from log_config import get_logger
+
+logger = get_logger("concurrency")
+
+_budget_applied = set()
+_budget_lock = threading.Lock()
+
+
+def inference_threads() -> int:
+    """Threads for one model forward pass (RAG_INFERENCE_THREADS, default: all cores)."""
+    return int(os.getenv("RAG_INFERENCE_THREADS", "0")) or os.cpu_count() or 1
+
+
+def search_threads() -> int:
+    """
+    OpenMP threads per FAISS search (RAG_SEARCH_THREADS, default 1).
+
+    Requests search in parallel on their own threads, so one thread per
+    search keeps 20 concurrent users from starting 20 x cores OpenMP
+    threads. Raise it for offline batch workloads.
+    """
+    return int(os.getenv("RAG_SEARCH_THREADS", "1"))
+
+
+def apply_thread_budget(library: str):
+    """
+    Apply the thread budget to "torch" or "faiss" (once per process).
+    """
+    with _budget_lock:
+        if library in _budget_applied:
+            return
+        _budget_applied.add(library)
+
+    if library == "torch":
+        import torch
+        torch.set_num_threads(inference_threads())
+        try:
+            # Only possible before torch has run any parallel work
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass
+        logger.info(f"🧵 torch: {inference_threads()} inference thread(s)")
+    elif library == "faiss":
+        import faiss
+        faiss.omp_set_num_threads(search_threads())
+        logger.info(f"🧵 faiss: {search_threads()} thread(s) per search")
+
+
+class ReadWriteLock:
+    """
+    Many readers or one writer.
+
+    Writers take priority: once a writer waits, new readers queue
+    behind it, so a swap cannot be starved by steady query traffic.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
@@ -0,0 +1,217 @@
+import re
+import zlib
+import numpy as np
+from collections import defaultdict
+from typing import List, Dict, Tuple
+from metadata_index import subject_of
+from log_config import get_logger
+
+logger = get_logger("dedup")
+
+_WORD = re.compile(r"\w+")
+
+# Largest value of a 32-bit MinHash slot (empty shingle sets)
+_EMPTY = np.uint32(0xFFFFFFFF)
+
+
+def shingle_hashes(text: str, size: int = 5) -> np.ndarray:
+    """32-bit hashes of the word size-grams of text (lowercased)."""
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return np.unique(np.fromiter(
+        (zlib.crc32(g.encode('utf-8')) for g in grams), dtype=np.uint64, count=len(grams)
+    ))
+
+
+class MinHashDeduplicator:
+    """
+    Near-duplicate detection with MinHash signatures and LSH banding.
+
+    Two chunks are duplicates when the estimated Jaccard similarity of
+    their word shingles is at least `threshold`. With `bands` x `rows`
+    signature slots, pairs around (1/bands)^(1/rows) similarity start
+    to become LSH candidates; candidates are then checked against the
+    threshold on the full signature.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        num_perm: int = 128,
+        bands: int = 16,
+        shingle_size: int = 5,
+        seed: int = 1
+    ):
+        """
+        Args:
+            threshold: Min estimated Jaccard similarity to merge
+            num_perm: MinHash signature length
+            bands: LSH bands (num_perm must divide evenly)
+            shingle_size: Words per shingle
+            seed: Hash family seed (fixed, so builds are reproducible)
+        """
+        if num_perm % bands:
+            raise ValueError("❌ num_perm must be a multiple of bands")
+
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        # Multiply-shift hashing: h(x) = (a*x + b) >> 32, a odd (uint64 wraps)
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+
+    def signatures(self, texts: List[str]) -> np.ndarray:
+        """MinHash signature per text, shape (n, num_perm), uint32."""
+        signatures = np.full((len(texts), self.num_perm), _EMPTY, dtype=np.uint32)
+        shift = np.uint64(32)
+
+        for i, text in enumerate(texts):
+            hashes = shingle_hashes(text, self.shingle_size)
+            if len(hashes):
+                # (shingles, num_perm) permuted hashes, min per column
+                permuted = (hashes[:, None] * self._a + self._b) >> shift
+                signatures[i] = permuted.min(axis=0)
+
+        return signatures
+
+    def clusters(self, texts: List[str]) -> List[List[int]]:
+        """
+        Groups of near-duplicate text indices (singletons included),
+        each sorted, ordered by first member.
+        """
+        signatures = self.signatures(texts)
+        parent = list(range(len(texts)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        # Texts sharing any band bucket are candidates
+        for band in range(self.bands):
+            buckets = defaultdict(list)
+            rows = signatures[:, band * self.rows:(band + 1) * self.rows]
+            for i, key in enumerate(map(bytes, rows)):
+                buckets[key].append(i)
+
+            for members in buckets.values():
+                first = members[0]
+                for other in members[1:]:
+                    a, b = find(first), find(other)
+                    if a == b:
+                        continue
+                    # Confirm on the full signature
+                    if np.mean(signatures[first] == signatures[other]) >= self.threshold:
+                        parent[max(a, b)] = min(a, b)
+
+        groups = defaultdict(list)
+        for i in range(len(texts)):
+            groups[find(i)].append(i)
+        return sorted(groups.values(), key=lambda g: g[0])
+
+    def deduplicate(self, chunks: List[Dict]) -> Tuple[List[Dict], Dict]:
+        """
+        Collapse near-duplicate chunks of the same subject into one.
+
+        Chunks of different subjects are never merged: a survivor has a
+        single 'subject', and subject filters / subject shards must keep
+        finding the text under each subject it appears in.
+
+        The first chunk of each group survives and gets a 'provenance'
+        list with the source/page/chunk_id/subject of every member
+        (itself first), so no original location is lost: the metadata
+        index lists the survivor under each copy's source and page, so
+        source and page filters still find it.
+
+        Args:
+            chunks: Chunks from TextSplitter
+
+        Returns:
+            (surviving chunks, stats dict)
+        """
+        by_subject = defaultdict(list)
+        for i, chunk in enumerate(chunks):
+            by_subject[subject_of(chunk)].append(i)
+
+        groups = []
+        for members in by_subject.values():
+            groups += [[members[j] for j in group] for group in self.clusters([chunks[i]['text'] for i in members])]
+        # Keep the original chunk order
+        groups.sort(key=lambda g: g[0])
+
+        survivors = []
+        for group in groups:
+            keep = dict(chunks[group[0]])
+            if len(group) > 1:
+                keep['provenance'] = [
+                    {
+                        'source': chunks[i]['source'],
+                        'page': chunks[i]['page'],
+                        'chunk_id': chunks[i].get('chunk_id', 1),
+                        'subject': subject_of(chunks[i])
+                    }
+                    for i in group
+                ]
+            survivors.append(keep)
+
+        stats = {
+            'chunks': len(chunks),
+            'kept': len(survivors),
+            'removed': len(chunks) - len(survivors),
+            'largest_group': max((len(g) for g in groups), default=0)
+        }
+        return survivors, stats
+
+
+def deduplicate_chunks(chunks: List[Dict], threshold: float = 0.8) -> List[Dict]:
+    """Build-time dedup stage: near-duplicate chunks collapsed, with provenance."""
+    survivors, stats = MinHashDeduplicator(threshold=threshold).deduplicate(chunks)
+    logger.info(
+        f"🧹 Dedup: {stats['chunks']} -> {stats['kept']} chunks "
+        f"({stats['removed']} near-duplicates removed, largest group {stats['largest_group']})"
+    )
+    return survivors
+
+
+# TEST
+if __name__ == "__main__":
+    import random
+    import time
+
+    print("🧪 TESTING NEAR-DUPLICATE DETECTION\n")
+
+    rng = random.Random(0)
+    vocab = [f"w{i}" for i in range(2000)]
+    base = [" ".join(rng.choice(vocab) for _ in range(200)) for _ in range(300)]
+
+    chunks = []
+    for i, text in enumerate(base):
+        chunks.append({'text': text, 'source': "notes.pdf", 'page': i + 1, 'chunk_id': 1, 'subject': "data_structure"})
+        # Every third text reappears in a question bank with two words changed
+        if i % 3 == 0:
+            words = text.split()
+            for j in rng.sample(range(len(words)), 2):
+                words[j] = rng.choice(vocab)
+            chunks.append({'text': " ".join(words), 'source': "qbank.pdf", 'page': i + 1, 'chunk_id': 1, 'subject': "data_structure"})
+
+    # The same text under another subject must survive on its own
+    chunks.append({'text': base[1], 'source': "os_notes.pdf", 'page': 1, 'chunk_id': 1, 'subject': "operating_system"})
+
+    start = time.perf_counter()
+    survivors = deduplicate_chunks(chunks)
+    elapsed = time.perf_counter() - start
+
+    merged = [c for c in survivors if 'provenance' in c]
+    print(f"Chunks: {len(chunks)} -> {len(survivors)} in {elapsed:.2f}s")
+    print(f"Merged groups: {len(merged)} (expected {len(range(0, 300, 3))})")
+    print(f"Example provenance: {merged[0]['provenance']}")
+    assert len(survivors) == len(base) + 1
+    print("\n✅ Test passed!")
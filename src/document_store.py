@@ -0,0 +1,215 @@
+import json
+import mmap
+import os
+import numpy as np
+from collections.abc import Sequence
+from pathlib import Path
+from typing import List, Dict
+from log_config import get_logger
+
+logger = get_logger("document_store")
+
+# Chunk metadata on disk, without pickle:
+#   documents.json          format version, count, small JSON columns
+#   documents.text          all chunk texts concatenated (UTF-8)
+#   documents.columns.npz   byte offsets + integer / dictionary-coded columns
+# Loading only parses JSON and plain numeric arrays (allow_pickle=False),
+# so a store received from another machine cannot run code. The text
+# file is memory-mapped and chunk dicts are built on access, so load
+# time barely grows with the number of chunks.
+COLUMNS_FILE = "documents.json"
+TEXT_FILE = "documents.text"
+ARRAYS_FILE = "documents.columns.npz"
+LEGACY_FILE = "documents.pkl"
+
+FORMAT_VERSION = 1
+
+
+class DocumentList(Sequence):
+    """Read-only list of chunk dicts backed by the columnar arrays."""
+
+    def __init__(self, text: bytes, offsets: np.ndarray, columns: Dict):
+        """
+        Args:
+            text: All chunk texts concatenated, UTF-8 (bytes or mmap)
+            offsets: Byte offsets into text (len = count + 1)
+            columns: name -> ('array', values) / ('dict', codes, uniques) / ('list', values)
+        """
+        self._text = text
+        self._offsets = offsets.tolist()
+        self._columns = []
+        for name, column in columns.items():
+            kind = column[0]
+            if kind == 'array':
+                self._columns.append((name, column[1].tolist(), None))
+            elif kind == 'dict':
+                self._columns.append((name, column[1].tolist(), column[2]))
+            else:
+                self._columns.append((name, column[1], None))
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("document index out of range")
+
+        doc = {'text': self._text[self._offsets[index]:self._offsets[index + 1]].decode('utf-8')}
+        for name, values, uniques in self._columns:
+            value = values[index] if uniques is None else uniques[values[index]]
+            if value is not None:
+                doc[name] = value
+        return doc
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, (int, np.integer)) and not isinstance(value, bool)
+
+
+def save_documents(documents: List[Dict], directory: str):
+    """
+    Write chunk dicts in the columnar format.
+
+    Args:
+        documents: Chunks ('text' plus JSON-serializable fields; fields
+                   missing from a chunk read back as missing)
+        directory: Store folder
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    fields = list(dict.fromkeys(k for doc in documents for k in doc if k != 'text'))
+    texts = [doc.get('text', '').encode('utf-8') for doc in documents]
+
+    offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum([len(t) for t in texts], out=offsets[1:])
+    arrays = {'_offsets': offsets}
+    json_columns = {}
+
+    for name in fields:
+        values = [doc.get(name) for doc in documents]
+
+        if all(_is_int(v) for v in values):
+            arrays[name] = np.asarray(values, dtype=np.int64)
+            json_columns[name] = {'kind': 'array'}
+        elif all(v is None or isinstance(v, str) for v in values):
+            # Repetitive strings (source, subject): small dictionary + codes
+            uniques = list(dict.fromkeys(values))
+            index = {v: i for i, v in enumerate(uniques)}
+            arrays[name] = np.asarray([index[v] for v in values], dtype=np.int32)
+            json_columns[name] = {'kind': 'dict', 'uniques': uniques}
+        else:
+            json_columns[name] = {'kind': 'list', 'values': values}
+
+    with open(directory / TEXT_FILE, 'wb') as f:
+        f.write(b"".join(texts))
+
+    with open(directory / ARRAYS_FILE, 'wb') as f:
+        np.savez(f, **arrays)
+
+    # Written last: its presence marks a complete save
+    with open(directory / COLUMNS_FILE, 'w', encoding='utf-8') as f:
+        json.dump({
+            'format_version': FORMAT_VERSION,
+            'count': len(documents),
+            'columns': json_columns
+        }, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def load_documents(directory: str, allow_legacy_pickle: bool = False) -> Sequence:
+    """
+    Read chunks saved by save_documents() as a DocumentList.
+
+    Args:
+        directory: Store folder
+        allow_legacy_pickle: Load a legacy documents.pkl (a plain list)
+                             if there are no columnar files. Off by
+                             default: pickle can run arbitrary code, so
+                             only convert stores you built yourself
+                             (python src/document_store.py migrate <dir>)
+
+    Raises:
+        ValueError: If the folder only has a legacy documents.pkl
+    """
+    directory = Path(directory)
+
+    if not (directory / COLUMNS_FILE).exists():
+        if (directory / LEGACY_FILE).exists():
+            if allow_legacy_pickle:
+                return _load_legacy(directory / LEGACY_FILE)
+            raise ValueError(
+                f"❌ {directory}/ only has a legacy {LEGACY_FILE}, which is not loaded "
+                f"(pickle can run code). If you built this store yourself, convert it with: "
+                f"python src/document_store.py migrate {directory}"
+            )
+        raise FileNotFoundError(f"❌ No documents found in {directory}/")
+
+    with open(directory / COLUMNS_FILE, encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta['format_version'] > FORMAT_VERSION:
+        raise ValueError(f"❌ {directory}/{COLUMNS_FILE} has a newer format ({meta['format_version']})")
+
+    with open(directory / TEXT_FILE, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        # The map stays valid after the file is closed
+        text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    with np.load(directory / ARRAYS_FILE, allow_pickle=False) as arrays:
+        offsets = arrays['_offsets']
+        columns = {}
+        for name, info in meta['columns'].items():
+            if info['kind'] == 'array':
+                columns[name] = ('array', arrays[name])
+            elif info['kind'] == 'dict':
+                columns[name] = ('dict', arrays[name], info['uniques'])
+            else:
+                columns[name] = ('list', info['values'])
+
+    if len(offsets) != meta['count'] + 1 or offsets[-1] != len(text):
+        raise ValueError(f"❌ {directory}/ document files are inconsistent")
+
+    return DocumentList(text, offsets, columns)
+
+
+def _load_legacy(path: Path) -> List[Dict]:
+    import pickle
+
+    logger.warning("⚠️ Loading legacy %s with pickle (trusted stores only)", path)
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def remove_legacy(directory: str):
+    """Delete documents.pkl once the columnar files exist."""
+    legacy = Path(directory) / LEGACY_FILE
+    if legacy.exists() and (Path(directory) / COLUMNS_FILE).exists():
+        os.remove(legacy)
+
+
+def migrate_legacy(directory: str):
+    """
+    Convert a trusted store's documents.pkl to the columnar format
+    (runs pickle once) and delete the pickle.
+    """
+    documents = load_documents(directory, allow_legacy_pickle=True)
+    if (Path(directory) / LEGACY_FILE).exists():
+        save_documents(list(documents), directory)
+        remove_legacy(directory)
+        logger.info(f"✅ Converted {len(documents)} documents in {directory}/ to the columnar format")
+    else:
+        logger.info(f"✅ {directory}/ already uses the columnar format")
+
+
+# MIGRATE
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate":
+        # python src/document_store.py migrate [directory]
+        migrate_legacy(sys.argv[2] if len(sys.argv) > 2 else "data/processed")
+    else:
+        print("Usage: python src/document_store.py migrate [directory]")
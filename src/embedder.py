@@ -1,56 +1,199 @@
-from sentence_transformers import SentenceTransformer
-from typing import List
+import os
+import threading
+import time
+from typing import List, Dict
 import numpy as np
+from concurrency import apply_thread_budget
+from micro_batcher import MicroBatcher
+from log_config import get_logger
+
+logger = get_logger("embedder")
+
+# Supported inference backends
+BACKENDS = ("torch", "onnx", "onnx-int8")
 
 class Embedder:
     """Generate embeddings for text chunks."""
-    
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        backend: str = None,
+        onnx_dir: str = "models/minilm-onnx",
+        normalize: bool = False,
+        micro_batch: bool = None
+    ):
         """
         Args:
             model_name: HuggingFace model for embeddings
+            backend: "torch", "onnx" or "onnx-int8"
+                     (default: EMBEDDER_BACKEND env var, else "torch")
+            onnx_dir: Folder created by `python src/embedder.py export`
+            normalize: L2-normalize embeddings (for cosine search)
+            micro_batch: Merge concurrent embed_query() calls into one
+                         forward pass (default: RAG_EMBED_MICRO_BATCH
+                         env var, else on)
         """
-        print(f"📥 Loading embedding model: {model_name}")
-        self.model = SentenceTransformer(model_name)
-        print("✅ Model loaded")
-    
+        backend = backend or os.getenv("EMBEDDER_BACKEND", "torch")
+        if backend not in BACKENDS:
+            raise ValueError(f"❌ Unknown embedder backend '{backend}'. Use one of {BACKENDS}")
+
+        self.backend = backend
+        self.normalize = normalize
+        logger.info(f"📥 Loading embedding model: {model_name} ({backend})")
+
+        if backend == "torch":
+            from sentence_transformers import SentenceTransformer
+            apply_thread_budget("torch")
+            self.model = SentenceTransformer(model_name)
+        else:
+            # Same encode() interface as SentenceTransformer
+            from onnx_embedder import OnnxEncoder
+            self.model = OnnxEncoder(onnx_dir, quantized=(backend == "onnx-int8"))
+
+        if micro_batch is None:
+            micro_batch = os.getenv("RAG_EMBED_MICRO_BATCH", "1") != "0"
+        self.micro_batch = micro_batch
+        self._batcher = None
+        self._batcher_lock = threading.Lock()
+
+        logger.info("✅ Model loaded")
+
     def embed_documents(self, texts: List[str]) -> np.ndarray:
         """
         Convert texts to embeddings.
-        
+
         Args:
             texts: List of text strings
-            
+
         Returns:
             Numpy array of embeddings
         """
-        print(f"🧠 Generating embeddings for {len(texts)} texts...")
-        embeddings = self.model.encode(texts, show_progress_bar=True)
-        print(f"✅ Embeddings generated: shape {embeddings.shape}")
+        logger.info(f"🧠 Generating embeddings for {len(texts)} texts...")
+        embeddings = self._postprocess(self.model.encode(texts, show_progress_bar=True))
+        logger.info(f"✅ Embeddings generated: shape {embeddings.shape}")
         return embeddings
-    
+
     def embed_query(self, query: str) -> np.ndarray:
-        """Embed a single query."""
-        return self.model.encode([query])[0]
+        """
+        Embed a single query.
+
+        With micro-batching on, queries arriving together from other
+        threads share one forward pass instead of queueing for the model.
+        The default wait is 0 ms: a lone query runs at once, and under
+        load the queries that piled up during the previous pass form
+        the next batch.
+        """
+        if not self.micro_batch:
+            return self._postprocess(self.model.encode([query]))[0]
+        return self._query_batcher().submit(query)
+
+    def _query_batcher(self) -> MicroBatcher:
+        """Batching worker for embed_query (started on first use)."""
+        if self._batcher is None:
+            with self._batcher_lock:
+                if self._batcher is None:
+                    self._batcher = MicroBatcher(
+                        self.embed_queries,
+                        max_batch_size=int(os.getenv("RAG_EMBED_BATCH_SIZE", "32")),
+                        max_wait_ms=float(os.getenv("RAG_EMBED_BATCH_WAIT_MS", "0")),
+                        name="embed-query-batcher"
+                    )
+        return self._batcher
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Embed several queries in one forward pass."""
+        return self._postprocess(self.model.encode(queries))
+
+    def _postprocess(self, embeddings: np.ndarray) -> np.ndarray:
+        """Apply unit-length normalization if enabled."""
+        if not self.normalize:
+            return embeddings
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.clip(norms, 1e-12, None)
+
+
+def check_parity(
+    texts: List[str],
+    model_name: str = "all-MiniLM-L6-v2",
+    onnx_dir: str = "models/minilm-onnx"
+) -> Dict[str, Dict[str, float]]:
+    """
+    Compare ONNX backends against the PyTorch backend.
+
+    Args:
+        texts: Sample texts to embed
+        model_name: HuggingFace model for embeddings
+        onnx_dir: Folder created by export_onnx()
+
+    Returns:
+        Per backend: min/mean cosine similarity to PyTorch
+        and average embed_query latency in ms
+    """
+    def cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        a = a / np.linalg.norm(a, axis=1, keepdims=True)
+        b = b / np.linalg.norm(b, axis=1, keepdims=True)
+        return (a * b).sum(axis=1)
+
+    def query_latency_ms(embedder: Embedder) -> float:
+        embedder.embed_query(texts[0])  # warm-up
+        start = time.perf_counter()
+        for text in texts:
+            embedder.embed_query(text)
+        return (time.perf_counter() - start) * 1000 / len(texts)
+
+    reference_embedder = Embedder(model_name, backend="torch", micro_batch=False)
+    reference = reference_embedder.model.encode(texts)
+    report = {'torch': {'min_cosine': 1.0, 'mean_cosine': 1.0,
+                        'query_ms': query_latency_ms(reference_embedder)}}
+
+    for backend in BACKENDS[1:]:
+        embedder = Embedder(model_name, backend=backend, onnx_dir=onnx_dir, micro_batch=False)
+        similarity = cosine(reference, embedder.model.encode(texts))
+        report[backend] = {
+            'min_cosine': float(similarity.min()),
+            'mean_cosine': float(similarity.mean()),
+            'query_ms': query_latency_ms(embedder)
+        }
+
+    return report
 
 
 # TEST
 if __name__ == "__main__":
-    print("🧪 TESTING EMBEDDER\n")
-    
+    import sys
+
     # Test texts
     texts = [
         "Arrays are contiguous memory locations",
         "Linked lists use pointers to connect nodes",
         "Stacks follow LIFO principle"
     ]
-    
-    # Create embedder
-    embedder = Embedder()
-    
-    # Generate embeddings
-    embeddings = embedder.embed_documents(texts)
-    
-    print(f"\n✅ Test passed!")
-    print(f"   Input: {len(texts)} texts")
-    print(f"   Output: {embeddings.shape}")
\ No newline at end of file
+
+    if len(sys.argv) > 1 and sys.argv[1] == "export":
+        # Export ONNX FP32 + int8 models (run once)
+        from onnx_embedder import export_onnx
+        export_onnx()
+
+    elif len(sys.argv) > 1 and sys.argv[1] == "parity":
+        # Compare ONNX backends with PyTorch
+        print("🧪 CHECKING BACKEND PARITY\n")
+        report = check_parity(texts)
+
+        print(f"\n{'Backend':<12}{'Min cos':>10}{'Mean cos':>10}{'Query ms':>10}")
+        for backend, stats in report.items():
+            print(f"{backend:<12}{stats['min_cosine']:>10.4f}"
+                  f"{stats['mean_cosine']:>10.4f}{stats['query_ms']:>10.2f}")
+
+    else:
+        print("🧪 TESTING EMBEDDER\n")
+
+        # Create embedder
+        embedder = Embedder()
+
+        # Generate embeddings
+        embeddings = embedder.embed_documents(texts)
+
+        print(f"\n✅ Test passed!")
+        print(f"   Input: {len(texts)} texts")
+        print(f"   Output: {embeddings.shape}")
@@ -0,0 +1,375 @@
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, Iterator, List, Optional
+from log_config import get_logger
+
+logger = get_logger("llm_backends")
+
+# Names accepted by create_backend() / the LLM_BACKEND env var
+BACKENDS = ("groq", "openai", "local", "router")
+
+
+class RateLimitError(Exception):
+    """Backend refused the request because of a rate limit / quota (HTTP 429)."""
+
+    def __init__(self, message: str, retry_after: float = None):
+        """
+        Args:
+            message: Error text
+            retry_after: Seconds the server asked us to wait (Retry-After), if any
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _retry_after(headers) -> Optional[float]:
+    """Retry-After header in seconds (the HTTP-date form is ignored)."""
+    try:
+        return float(headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """
+    Request budget shared by every call to the remote backend.
+
+    A token bucket refilled at requests_per_minute, plus a pause that
+    blocks all callers after a 429: concurrent retries wait together
+    instead of each hitting the limit again.
+    """
+
+    def __init__(self, requests_per_minute: float = None, burst: int = None):
+        """
+        Args:
+            requests_per_minute: Budget (default: LLM_REQUESTS_PER_MINUTE
+                                 env var, else 30 - Groq's free tier; 0 = no budget)
+            burst: Requests allowed back to back (default: LLM_RATE_BURST
+                   env var, else 5)
+        """
+        if requests_per_minute is None:
+            requests_per_minute = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "30"))
+        self.rate = requests_per_minute / 60
+        self.capacity = burst or int(os.getenv("LLM_RATE_BURST", "5"))
+
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until a request may be sent; returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._paused_until - now
+                if wait <= 0:
+                    if self.rate <= 0:
+                        return waited
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return waited
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def pause(self, seconds: float):
+        """Hold back every caller for `seconds` (after a 429)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class GroqBackend:
+    """Groq cloud API."""
+
+    name = "groq"
+    is_local = False
+
+    def __init__(
+        self,
+        api_key: str = None,
+        model: str = None,
+        base_url: str = None,
+        max_retries: int = None
+    ):
+        """
+        Args:
+            api_key: Groq key (default: GROQ_API_KEY)
+            model: Model name (default: GROQ_MODEL or llama-3.3-70b-versatile)
+            base_url: Compatible server (default: GROQ_BASE_URL)
+            max_retries: SDK-internal retries (default: GROQ_SDK_MAX_RETRIES or 2)
+        """
+        api_key = api_key or os.getenv("GROQ_API_KEY")
+        if not api_key:
+            raise ValueError("❌ GROQ_API_KEY not found in .env file")
+
+        # Imported here so importing this module stays cheap
+        from groq import Groq
+
+        # GROQ_BASE_URL points at a compatible server (e.g. the local
+        # fake in benchmarks/); GROQ_SDK_MAX_RETRIES controls the SDK's
+        # own retries, which run before LLMHandler's retry loop
+        self.client = Groq(
+            api_key=api_key,
+            base_url=base_url or os.getenv("GROQ_BASE_URL") or None,
+            max_retries=max_retries if max_retries is not None else int(os.getenv("GROQ_SDK_MAX_RETRIES", "2"))
+        )
+        self.model = model or os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+        logger.info("✅ Groq API initialized")
+
+    def complete(self, messages: List[Dict], temperature: float, max_tokens: int, stop: List[str] = None) -> str:
+        return "".join(self.stream(messages, temperature, max_tokens, stop))
+
+    def stream(self, messages: List[Dict], temperature: float, max_tokens: int, stop: List[str] = None) -> Iterator[str]:
+        """Answer text piece by piece as the server generates it."""
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stop=stop or None,
+                stream=True
+            )
+        except Exception as e:
+            if getattr(e, 'status_code', None) == 429:
+                response = getattr(e, 'response', None)
+                raise RateLimitError(str(e), _retry_after(getattr(response, 'headers', None))) from e
+            raise
+
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class OpenAICompatibleBackend:
+    """Any server speaking the OpenAI chat completions API (vLLM, llama.cpp server, Ollama, ...)."""
+
+    name = "openai"
+    is_local = False
+
+    def __init__(
+        self,
+        base_url: str = None,
+        api_key: str = None,
+        model: str = None,
+        timeout: float = 60.0
+    ):
+        """
+        Args:
+            base_url: Server root, e.g. http://127.0.0.1:8080 (default: OPENAI_BASE_URL)
+            api_key: Bearer token if the server needs one (default: OPENAI_API_KEY)
+            model: Model name sent in requests (default: OPENAI_MODEL)
+            timeout: Request timeout in seconds
+        """
+        base_url = base_url or os.getenv("OPENAI_BASE_URL")
+        if not base_url:
+            raise ValueError("❌ OPENAI_BASE_URL not set for the OpenAI-compatible backend")
+
+        self.url = base_url.rstrip("/") + "/v1/chat/completions"
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.model = model or os.getenv("OPENAI_MODEL", "default")
+        self.timeout = timeout
+        logger.info(f"✅ OpenAI-compatible backend at {base_url}")
+
+    def complete(self, messages: List[Dict], temperature: float, max_tokens: int, stop: List[str] = None) -> str:
+        return "".join(self.stream(messages, temperature, max_tokens, stop))
+
+    def stream(self, messages: List[Dict], temperature: float, max_tokens: int, stop: List[str] = None) -> Iterator[str]:
+        """Answer text piece by piece (server-sent events)."""
+        body = json.dumps({
+            'model': self.model,
+            'messages': messages,
+            'temperature': temperature,
+            'max_tokens': max_tokens,
+            'stream': True,
+            **({'stop': stop} if stop else {})
+        }).encode('utf-8')
+
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+
+        request = urllib.request.Request(self.url, data=body, headers=headers, method="POST")
+        try:
+            response = urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            if e.code == 429:
+                raise RateLimitError(f"429 from {self.url}", _retry_after(e.headers)) from e
+            raise
+
+        with response:
+            for line in response:
+                line = line.strip()
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[len(b"data:"):].strip()
+                if data == b"[DONE]":
+                    break
+                choices = json.loads(data).get('choices') or []
+                piece = choices[0].get('delta', {}).get('content') if choices else None
+                if piece:
+                    yield piece
+
+
+class LlamaCppBackend:
+    """Local CPU model (GGUF) through llama-cpp-python."""
+
+    name = "local"
+    is_local = True
+
+    def __init__(self, model_path: str = None, n_ctx: int = 4096, n_threads: int = None):
+        """
+        Args:
+            model_path: GGUF file (default: LOCAL_MODEL_PATH)
+            n_ctx: Context window in tokens
+            n_threads: CPU threads (default: llama.cpp's choice)
+        """
+        model_path = model_path or os.getenv("LOCAL_MODEL_PATH")
+        if not model_path:
+            raise ValueError("❌ LOCAL_MODEL_PATH not set for the local backend")
+
+        try:
+            from llama_cpp import Llama
+        except ImportError:
+            raise ImportError("❌ llama-cpp-python is not installed. Run: pip install llama-cpp-python")
+
+        logger.info(f"📥 Loading local model: {model_path}")
+        self.model = Llama(model_path=model_path, n_ctx=n_ctx, n_threads=n_threads, verbose=False)
+
+        # One llama.cpp context cannot serve two requests at once
+        self._lock = threading.Lock()
+        logger.info("✅ Local model loaded")
+
+    def complete(self, messages: List[Dict], temperature: float, max_tokens: int, stop: List[str] = None) -> str:
+        return "".join(self.stream(messages, temperature, max_tokens, stop))
+
+    def stream(self, messages: List[Dict], temperature: float, max_tokens: int, stop: List[str] = None) -> Iterator[str]:
+        """Answer text piece by piece as llama.cpp generates it."""
+        with self._lock:
+            for chunk in self.model.create_chat_completion(
+                messages=messages, temperature=temperature, max_tokens=max_tokens,
+                stop=stop or None, stream=True
+            ):
+                piece = chunk['choices'][0]['delta'].get('content')
+                if piece:
+                    yield piece
+
+
+class LLMRouter:
+    """
+    Pick a backend per question.
+
+    Short questions (few marks, or optionally few words) go to the local model,
+    everything else to the remote one. After the remote backend
+    is rate limited or fails, all traffic goes local for a cooldown.
+    """
+
+    def __init__(
+        self,
+        remote=None,
+        local=None,
+        local_max_marks: int = 2,
+        short_query_words: int = 0,
+        cooldown_s: float = 60.0
+    ):
+        """
+        Args:
+            remote: Remote backend (Groq / OpenAI-compatible), may be None
+            local: Local backend, may be None
+            local_max_marks: Questions worth this much or less go local
+            short_query_words: Questions this short go local (up to 5 marks,
+                               0 = off: most exam questions are short)
+            cooldown_s: How long to avoid the remote after a 429 / error
+        """
+        if remote is None and local is None:
+            raise ValueError("❌ LLMRouter needs at least one backend")
+
+        self.remote = remote
+        self.local = local
+        self.local_max_marks = local_max_marks
+        self.short_query_words = short_query_words
+        self.cooldown_s = cooldown_s
+        self._remote_blocked_until = 0.0
+
+    def select(self, query: str, marks: int):
+        """Backend to use for this question."""
+        if self.local is None:
+            return self.remote
+        if self.remote is None or time.monotonic() < self._remote_blocked_until:
+            return self.local
+
+        is_short = marks <= self.local_max_marks or (
+            marks <= 5 and 0 < len(query.split()) <= self.short_query_words
+        )
+        return self.local if is_short else self.remote
+
+    def fallback(self, backend) -> Optional[object]:
+        """
+        Called when backend hit a rate limit or failed.
+
+        Returns:
+            Backend to retry on right away, or None to back off and retry
+        """
+        if backend is self.remote and self.local is not None:
+            self._remote_blocked_until = time.monotonic() + self.cooldown_s
+            logger.warning("⚠️ Remote LLM unavailable - routing to local model for %.0fs", self.cooldown_s)
+            return self.local
+        return None
+
+
+def create_backend(name: str):
+    """
+    Build one backend by name ("groq", "openai" or "local").
+    """
+    if name == "groq":
+        return GroqBackend()
+    if name == "openai":
+        return OpenAICompatibleBackend()
+    if name == "local":
+        return LlamaCppBackend()
+    raise ValueError(f"❌ Unknown LLM backend '{name}'. Use one of {BACKENDS}")
+
+
+def create_router(name: str = None) -> LLMRouter:
+    """
+    Router for the configured backend(s).
+
+    Args:
+        name: Backend name (default: LLM_BACKEND env var, else "router"
+              when LOCAL_MODEL_PATH is set, else "groq"). "router"
+              combines LLM_REMOTE_BACKEND (default groq) with the local
+              model; a single name routes everything to it.
+    """
+    name = name or os.getenv("LLM_BACKEND") or ("router" if os.getenv("LOCAL_MODEL_PATH") else "groq")
+
+    if name != "router":
+        backend = create_backend(name)
+        if backend.is_local:
+            return LLMRouter(local=backend)
+        return LLMRouter(remote=backend)
+
+    remote, local = None, None
+    try:
+        remote = create_backend(os.getenv("LLM_REMOTE_BACKEND", "groq"))
+    except Exception as e:
+        logger.warning("⚠️ Remote LLM unavailable, using local model only: %s", e)
+    try:
+        local = create_backend("local")
+    except Exception as e:
+        logger.warning("⚠️ Local LLM unavailable, using remote only: %s", e)
+
+    return LLMRouter(
+        remote=remote,
+        local=local,
+        local_max_marks=int(os.getenv("LLM_LOCAL_MAX_MARKS", "2")),
+        short_query_words=int(os.getenv("LLM_SHORT_QUERY_WORDS", "0")),
+        cooldown_s=float(os.getenv("LLM_REMOTE_COOLDOWN_S", "60"))
+    )
@@ -1,23 +1,32 @@
-import os
 import time
 from dotenv import load_dotenv
-from groq import Groq
+from log_config import get_logger
+from llm_backends import RateLimiter, RateLimitError, create_router
+import metrics
+from prompts import build_messages, mode_settings, prompt_key
+
+logger = get_logger("llm_handler")
 
 # Load environment variables
 load_dotenv()
 
 class LLMHandler:
-    """Handle Groq API calls for answer generation."""
+    """Generate answers with the configured LLM backend(s)."""
     
-    def __init__(self):
-        """Initialize Groq API."""
-        api_key = os.getenv("GROQ_API_KEY")
-        
-        if not api_key:
-            raise ValueError("❌ GROQ_API_KEY not found in .env file")
+    def __init__(self, backend: str = None, router=None, limiter: RateLimiter = None):
+        """
+        Initialize the LLM backend(s).
         
-        self.client = Groq(api_key=api_key)
-        print("✅ Groq API initialized")
+        Args:
+            backend: "groq", "openai", "local" or "router"
+                     (default: LLM_BACKEND env var, else "groq")
+            router: Use this LLMRouter instead of building one
+            limiter: Request budget for remote calls, shared by all
+                     threads using this handler (default: from env,
+                     see RateLimiter)
+        """
+        self.router = router or create_router(backend)
+        self.limiter = limiter or RateLimiter()
     
     def generate_answer(self, query: str, context: str, marks: int = 5) -> str:
         """
@@ -25,14 +34,23 @@ class LLMHandler:
         
         Args:
             query: User question
-            context: Retrieved text from PDFs
-            marks: Answer length (default 5 marks)
+            context: Retrieved chunks (or their joined text)
+            marks: Answer length (default 5 marks, see prompts.MARK_TEMPLATES)
         
         Returns:
             Generated answer
         """
-        # Build prompt
-        prompt = self._build_prompt(query, context)
+        # Build prompt (stable prefix first, see prompts.py)
+        with metrics.span("prompt_build"):
+            messages = build_messages(query, context, marks)
+        settings = mode_settings(marks)
+        
+        # The system message is the shared prefix providers can cache:
+        # one key per marks mode and PROMPT_VERSION, or the prefix drifted
+        prefix = prompt_key(messages[:1])[:12]
+        metrics.increment("rag_llm_prompt_prefix_total", prefix=prefix)
+        
+        backend = self.router.select(query, marks)
         
         # Retry logic
         max_retries = 3
@@ -40,62 +58,70 @@ class LLMHandler:
         
         for attempt in range(max_retries):
             try:
-                # Call Groq
-                response = self.client.chat.completions.create(
-                    model="llama-3.3-70b-versatile",
-                    messages=[
-                        {"role": "system", "content": "You are an RGPV exam assistant. Answer questions using ONLY the provided context."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.3,
-                    max_tokens=300
-                )
-                return response.choices[0].message.content
+                if not backend.is_local:
+                    with metrics.span("rate_limit_wait"):
+                        self.limiter.acquire()
+                logger.debug("🧾 LLM call on %s, prompt prefix %s", backend.name, prefix)
+                with metrics.span("llm_call"):
+                    answer = self._complete(backend, messages, settings)
+                metrics.increment("rag_llm_calls_total", outcome="ok", backend=backend.name)
+                return answer
             
             except Exception as e:
-                error_msg = str(e).lower()
-                
-                # Check if rate limit error
-                if "429" in error_msg or "rate" in error_msg:
+                # Both backends raise RateLimitError on HTTP 429
+                if isinstance(e, RateLimitError):
+                    metrics.increment("rag_llm_calls_total", outcome="rate_limited", backend=backend.name)
+                    
+                    # Switch to the local model instead of waiting out the quota
+                    fallback = self.router.fallback(backend)
+                    if fallback is not None:
+                        backend = fallback
+                        continue
+                    
                     if attempt < max_retries - 1:
-                        wait_time = base_delay * (2 ** attempt)
-                        print(f"⏳ Rate limit hit. Waiting {wait_time}s before retry {attempt + 2}/{max_retries}...")
-                        time.sleep(wait_time)
+                        wait_time = e.retry_after or base_delay * (2 ** attempt)
+                        logger.warning("⏳ Rate limit hit. Waiting %ss before retry %d/%d...", wait_time, attempt + 2, max_retries)
+                        metrics.increment("rag_llm_retries_total")
+                        # Every caller backs off, not just this one; the
+                        # wait happens in acquire() on the next attempt
+                        self.limiter.pause(wait_time)
                         continue
                     else:
                         return "❌ Rate limit exceeded. Please try again in a moment."
                 else:
+                    metrics.increment("rag_llm_calls_total", outcome="error", backend=backend.name)
+                    fallback = self.router.fallback(backend)
+                    if fallback is not None:
+                        backend = fallback
+                        continue
                     return f"❌ Error generating answer: {str(e)}"
         
         return "❌ Failed after multiple retries."
     
-    def _build_prompt(self, query: str, context: str) -> str:
-        """Build prompt for LLM (5 marks format)."""
-        
-        prompt = f"""You are an RGPV exam assistant helping students prepare for exams.
-
-CONTEXT FROM STUDY MATERIAL:
-{context}
-
-QUESTION: {query}
-
-INSTRUCTIONS:
-- Write a clear, exam-style answer in 5 marks format (100-150 words)
-- Use ONLY the information provided in the context above
-- Structure your answer in a single well-organized paragraph
-- Include examples if they are mentioned in the context
-- Write naturally as if explaining to a student
-- Do NOT say "information not available" - if the context has relevant info, use it to answer
-- If the context truly has nothing relevant, then say "This topic is not covered in the provided material"
-
-ANSWER:"""
+    @staticmethod
+    def _complete(backend, messages, settings) -> str:
+        """
+        Stream the answer, recording the time to the first piece as the
+        llm_first_token stage (what a cached prompt prefix shortens).
+        """
+        stream = getattr(backend, 'stream', None)
+        if stream is None:
+            return backend.complete(
+                messages, temperature=0.3, max_tokens=settings['max_tokens'], stop=settings['stop']
+            )
         
-        return prompt
+        start = time.perf_counter()
+        pieces = []
+        for piece in stream(messages, temperature=0.3, max_tokens=settings['max_tokens'], stop=settings['stop']):
+            if not pieces:
+                metrics.record_stage("llm_first_token", time.perf_counter() - start)
+            pieces.append(piece)
+        return "".join(pieces)
 
 
 # TEST
 if __name__ == "__main__":
-    print("🧪 TESTING GROQ API\n")
+    print("🧪 TESTING LLM BACKEND\n")
     
     try:
         llm = LLMHandler()
@@ -121,5 +147,5 @@ if __name__ == "__main__":
         print(f"❌ Error: {e}")
         print("\nMake sure:")
         print("1. .env file exists in project root")
-        print("2. GROQ_API_KEY is set in .env")
+        print("2. GROQ_API_KEY is set in .env (or LLM_BACKEND=openai/local is configured)")
         print("3. API key is valid")
\ No newline at end of file
@@ -0,0 +1,30 @@
+import logging
+import os
+
+# Parent logger for every pipeline module
+ROOT_LOGGER = "rag"
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Logger for a pipeline module (e.g. get_logger("retriever")).
+
+    The level comes from the RAG_LOG_LEVEL env var (default INFO).
+    Per-request messages are logged at DEBUG, so with the default level
+    they are skipped before any formatting happens.
+    """
+    root = logging.getLogger(ROOT_LOGGER)
+
+    if not root.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        root.addHandler(handler)
+        root.setLevel(os.getenv("RAG_LOG_LEVEL", "INFO").upper())
+        root.propagate = False
+
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def set_level(level: str):
+    """Change the pipeline log level at runtime (e.g. "DEBUG")."""
+    logging.getLogger(ROOT_LOGGER).setLevel(level.upper())
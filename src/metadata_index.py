@@ -0,0 +1,175 @@
+import json
+import numpy as np
+from pathlib import Path
+from typing import List, Dict, Tuple, Optional
+from snapshots import resolve_store_dir
+
+# Manifest of a sharded store (see sharded_vector_store.py)
+SHARD_MANIFEST = "shards.json"
+
+
+def chunk_key(doc: Dict) -> str:
+    """Stable chunk identifier "source:page:chunk_id" (survives rebuilds)."""
+    return f"{doc['source']}:{doc['page']}:{doc.get('chunk_id', 1)}"
+
+
+def subject_of(doc: Dict) -> str:
+    """Subject of a chunk (falls back to the PDF name for older stores)."""
+    return doc.get('subject') or Path(doc['source']).stem
+
+
+def locations(doc: Dict) -> List[Tuple[str, int]]:
+    """
+    (source, page) of every copy of a chunk: its own, then the copies
+    merged into it by dedup (its 'provenance').
+    """
+    found = [(doc['source'], doc['page'])]
+    for copy in doc.get('provenance', ()):
+        location = (copy['source'], copy['page'])
+        if location not in found:
+            found.append(location)
+    return found
+
+
+class MetadataIndex:
+    """
+    Compact source -> ID ranges index over a VectorStore.
+
+    Chunks are added PDF by PDF, so each source is a handful of
+    contiguous [start, end) ranges no matter how many chunks it has.
+    A deduplicated chunk is listed under the source of each of its
+    copies, so source filters still find text whose copy was merged away.
+    """
+
+    def __init__(
+        self,
+        ranges: Dict[str, List[List[int]]],
+        subjects: Dict[str, List[str]]
+    ):
+        """
+        Args:
+            ranges: source -> list of [start, end) ID ranges
+            subjects: subject -> list of sources
+        """
+        self.ranges = ranges
+        self.subjects = subjects
+
+    @classmethod
+    def from_documents(cls, documents: List[Dict]) -> "MetadataIndex":
+        """Build the index from document metadata (row i = vector ID i)."""
+        ranges = {}
+        subjects = {}
+
+        for idx, doc in enumerate(documents):
+            subject_sources = subjects.setdefault(subject_of(doc), [])
+
+            for source in dict.fromkeys(source for source, _ in locations(doc)):
+                source_ranges = ranges.setdefault(source, [])
+
+                # Extend the last range or open a new one
+                if source_ranges and source_ranges[-1][1] == idx:
+                    source_ranges[-1][1] = idx + 1
+                else:
+                    source_ranges.append([idx, idx + 1])
+
+                if source not in subject_sources:
+                    subject_sources.append(source)
+
+        return cls(ranges, subjects)
+
+    def resolve_sources(
+        self,
+        subject: Optional[str] = None,
+        sources: Optional[List[str]] = None
+    ) -> List[str]:
+        """
+        Sources matching a subject and/or explicit source list.
+
+        Args:
+            subject: Subject name (None = any)
+            sources: Source PDF names (None = any)
+
+        Returns:
+            Matching source names
+        """
+        selected = list(self.ranges)
+
+        if subject is not None:
+            selected = [s for s in selected if s in self.subjects.get(subject, [])]
+        if sources is not None:
+            selected = [s for s in selected if s in sources]
+
+        return selected
+
+    def ids_for_source(self, source: str) -> np.ndarray:
+        """All vector IDs belonging to one source."""
+        return np.concatenate([
+            np.arange(start, end, dtype='int64')
+            for start, end in self.ranges.get(source, [])
+        ] or [np.zeros(0, dtype='int64')])
+
+    def save(self, path: str):
+        """Write the index as JSON."""
+        with open(path, 'w') as f:
+            json.dump({'ranges': self.ranges, 'subjects': self.subjects}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "MetadataIndex":
+        """Read an index written by save()."""
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data['ranges'], data['subjects'])
+
+
+def page_bounds(pages: np.ndarray, page_range: Tuple[int, int]) -> Tuple[int, int]:
+    """
+    Positions [lo, hi) of pages within an inclusive page range.
+
+    Args:
+        pages: Page numbers sorted ascending
+        page_range: (first_page, last_page), inclusive
+
+    Returns:
+        Slice bounds into pages
+    """
+    first, last = page_range
+    lo = int(np.searchsorted(pages, first, side='left'))
+    hi = int(np.searchsorted(pages, last, side='right'))
+    return lo, hi
+
+
+def read_store_info(directory: str) -> Dict:
+    """
+    Metric and subjects of a saved store, read from its small JSON
+    files only (no FAISS or model import).
+
+    Args:
+        directory: Single-store folder or sharded store folder
+
+    Returns:
+        {'metric': str, 'subjects': [str, ...]}
+    """
+    directory = resolve_store_dir(directory)
+
+    shard_manifest = directory / SHARD_MANIFEST
+    if shard_manifest.exists():
+        with open(shard_manifest) as f:
+            manifest = json.load(f)
+        subjects = {s for info in manifest['shards'].values() for s in info['subjects']}
+        return {'metric': manifest['metric'], 'subjects': sorted(subjects)}
+
+    metric = "l2"
+    config_path = directory / "store_config.json"
+    if config_path.exists():
+        with open(config_path) as f:
+            metric = json.load(f)['metric']
+
+    metadata_path = directory / "metadata_index.json"
+    if metadata_path.exists():
+        subjects = sorted(MetadataIndex.load(str(metadata_path)).subjects)
+    else:
+        # Older stores have no metadata index; subjects become
+        # available once the retriever has loaded
+        subjects = []
+
+    return {'metric': metric, 'subjects': subjects}
@@ -0,0 +1,231 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+from log_config import get_logger
+
+logger = get_logger("metrics")
+
+# Quantiles reported for every histogram
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Prometheus metric names
+STAGE_METRIC = "rag_stage_seconds"
+
+
+class Histogram:
+    """
+    Latency samples over a sliding window plus lifetime count/sum.
+    Quantiles are computed on read, so observe() stays O(1).
+    """
+
+    def __init__(self, window: int = 2048):
+        """
+        Args:
+            window: Number of recent samples kept for quantiles
+        """
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.samples.append(value)
+            self.count += 1
+            self.sum += value
+
+    def quantiles(self, qs: Tuple[float, ...] = QUANTILES) -> Dict[float, float]:
+        """Nearest-rank quantiles of the current window."""
+        with self._lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return {q: 0.0 for q in qs}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in qs}
+
+
+_lock = threading.Lock()
+_histograms: Dict[Tuple[str, Tuple], Histogram] = {}
+_counters: Dict[Tuple[str, Tuple], float] = {}
+
+# Per-thread trace of the request being served (see trace())
+_local = threading.local()
+
+
+def _key(name: str, labels: Dict[str, str]) -> Tuple[str, Tuple]:
+    return name, tuple(sorted(labels.items()))
+
+
+def observe(name: str, value: float, **labels):
+    """Record one sample in a histogram."""
+    key = _key(name, labels)
+    histogram = _histograms.get(key)
+    if histogram is None:
+        with _lock:
+            histogram = _histograms.setdefault(key, Histogram())
+    histogram.observe(value)
+
+
+def increment(name: str, value: float = 1, **labels):
+    """Add to a counter."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+@contextmanager
+def span(stage: str):
+    """
+    Time a pipeline stage (embed, search, llm_call, ...).
+
+    The duration goes into the rag_stage_seconds histogram and, if a
+    trace() is active on this thread, into that request's timings.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+def record_stage(stage: str, elapsed: float):
+    """Record a stage duration measured by the caller (see span())."""
+    observe(STAGE_METRIC, elapsed, stage=stage)
+
+    timings = getattr(_local, 'timings', None)
+    if timings is not None:
+        # Repeated stages (e.g. retried LLM calls) add up
+        timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+@contextmanager
+def trace():
+    """
+    Collect the span timings of one request on this thread.
+
+    Usage:
+        with metrics.trace() as timings:
+            ...
+        timings -> {'embed': 0.012, 'search': 0.001, ...}
+    """
+    previous = getattr(_local, 'timings', None)
+    timings = {}
+    _local.timings = timings
+    try:
+        yield timings
+    finally:
+        _local.timings = previous
+
+
+def dump() -> Dict:
+    """
+    Snapshot of all metrics.
+
+    Returns:
+        {'histograms': [{name, labels, count, sum, p50, p95, p99}],
+         'counters': [{name, labels, value}]}
+    """
+    with _lock:
+        histograms = list(_histograms.items())
+        counters = list(_counters.items())
+
+    rows = []
+    for (name, labels), histogram in sorted(histograms, key=lambda item: item[0]):
+        q = histogram.quantiles()
+        rows.append({
+            'name': name, 'labels': dict(labels),
+            'count': histogram.count, 'sum': histogram.sum,
+            'p50': q[0.5], 'p95': q[0.95], 'p99': q[0.99]
+        })
+
+    return {
+        'histograms': rows,
+        'counters': [
+            {'name': name, 'labels': dict(labels), 'value': value}
+            for (name, labels), value in sorted(counters, key=lambda item: item[0])
+        ]
+    }
+
+
+def _format_labels(labels: Dict[str, str], **extra) -> str:
+    labels = {**labels, **extra}
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+def render_prometheus() -> str:
+    """All metrics in Prometheus text exposition format."""
+    snapshot = dump()
+    lines: List[str] = []
+
+    typed = set()
+    for row in snapshot['histograms']:
+        name, labels = row['name'], row['labels']
+        if name not in typed:
+            lines.append(f"# TYPE {name} summary")
+            typed.add(name)
+        for q in QUANTILES:
+            value = row[f"p{int(q * 100)}"]
+            lines.append(f"{name}{_format_labels(labels, quantile=q)} {value:.6f}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {row['sum']:.6f}")
+        lines.append(f"{name}_count{_format_labels(labels)} {row['count']}")
+
+    for row in snapshot['counters']:
+        name = row['name']
+        if name not in typed:
+            lines.append(f"# TYPE {name} counter")
+            typed.add(name)
+        lines.append(f"{name}{_format_labels(row['labels'])} {row['value']:g}")
+
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    """Drop all metrics (for benchmarks)."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def start_http_server(port: int = 9108, host: str = None):
+    """
+    Serve GET /metrics in a background thread.
+
+    Args:
+        port: Port to listen on
+        host: Interface to bind (default: RAG_METRICS_HOST env var,
+              else 127.0.0.1 - set 0.0.0.0 to expose it on the network)
+
+    Returns:
+        The server, or None if the port could not be bound
+    """
+    host = host or os.getenv("RAG_METRICS_HOST", "127.0.0.1")
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        # E.g. port in use: serving answers matters more than metrics
+        logger.error("❌ Metrics endpoint not started on %s:%s: %s", host, port, e)
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,118 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, List, Sequence
+
+# Sentinel that stops the worker thread
+_STOP = object()
+
+
+class _Pending:
+    """One submitted item waiting for its result."""
+
+    __slots__ = ("item", "result", "error", "done")
+
+    def __init__(self, item: Any):
+        self.item = item
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class MicroBatcher:
+    """
+    Merge items submitted by concurrent callers into batches.
+
+    A worker thread takes the first waiting item, collects more until
+    the batch is full or max_wait_ms has passed, runs batch_fn once on
+    the whole batch and hands each caller its own result.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], Sequence[Any]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        name: str = "micro-batcher"
+    ):
+        """
+        Args:
+            batch_fn: Takes a list of items, returns results in the same order
+            max_batch_size: Largest batch passed to batch_fn
+            max_wait_ms: How long the first item waits for company
+            name: Worker thread name
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        # Simple counters for tuning batch size / wait
+        self.batches = 0
+        self.items = 0
+
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, item: Any) -> Any:
+        """Process one item (blocks until its batch has run)."""
+        return self.submit_many([item])[0]
+
+    def submit_many(self, items: List[Any]) -> List[Any]:
+        """Process several items; they may share a batch with other callers."""
+        pending = [_Pending(item) for item in items]
+        for p in pending:
+            self._queue.put(p)
+
+        results = []
+        for p in pending:
+            p.done.wait()
+            if p.error is not None:
+                raise p.error
+            results.append(p.result)
+        return results
+
+    def close(self):
+        """Stop the worker after the queued items are processed."""
+        self._queue.put(_STOP)
+        self._worker.join()
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            stop = False
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    nxt = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is _STOP:
+                    stop = True
+                    break
+                batch.append(nxt)
+
+            self._process(batch)
+            if stop:
+                return
+
+    def _process(self, batch: List[_Pending]):
+        self.batches += 1
+        self.items += len(batch)
+
+        try:
+            results = self.batch_fn([p.item for p in batch])
+            for p, result in zip(batch, results):
+                p.result = result
+        except Exception as e:
+            for p in batch:
+                p.error = e
+        finally:
+            for p in batch:
+                p.done.set()
@@ -0,0 +1,204 @@
+import json
+import numpy as np
+from pathlib import Path
+from typing import List
+from concurrency import inference_threads
+from log_config import get_logger
+
+logger = get_logger("onnx_embedder")
+
+# Files written by export_onnx()
+FP32_MODEL_FILE = "model.onnx"
+INT8_MODEL_FILE = "model_int8.onnx"
+CONFIG_FILE = "embedder_config.json"
+
+
+class OnnxEncoder:
+    """
+    ONNX Runtime drop-in for SentenceTransformer.encode().
+    Runs the exported transformer and does mean pooling in NumPy.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = False):
+        """
+        Args:
+            model_dir: Folder created by export_onnx()
+            quantized: Load the int8 model instead of FP32
+        """
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("❌ onnxruntime is not installed. Run: pip install onnxruntime")
+        from transformers import AutoTokenizer
+
+        model_dir = Path(model_dir)
+        model_file = model_dir / (INT8_MODEL_FILE if quantized else FP32_MODEL_FILE)
+
+        if not model_file.exists():
+            raise FileNotFoundError(
+                f"❌ {model_file} not found. Run: python src/embedder.py export"
+            )
+
+        with open(model_dir / CONFIG_FILE) as f:
+            config = json.load(f)
+
+        self.model_name = config['model_name']
+        self.max_seq_length = config['max_seq_length']
+        self.normalize = config['normalize']
+        self.dimension = config['dimension']
+
+        self.tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = inference_threads()
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            str(model_file), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(
+        self,
+        texts: List[str],
+        batch_size: int = 32,
+        show_progress_bar: bool = False
+    ) -> np.ndarray:
+        """
+        Encode texts the same way SentenceTransformer does.
+
+        Args:
+            texts: List of text strings
+            batch_size: Texts per forward pass
+            show_progress_bar: Accepted for API compatibility (ignored)
+
+        Returns:
+            Numpy array of shape (len(texts), dimension)
+        """
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            feeds = {
+                name: value.astype(np.int64)
+                for name, value in encoded.items()
+                if name in self.input_names
+            }
+            token_embeddings = self.session.run(None, feeds)[0]
+
+            # Mean pooling over real (non-padding) tokens
+            mask = encoded['attention_mask'][..., None].astype(np.float32)
+            summed = (token_embeddings * mask).sum(axis=1)
+            pooled = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+
+            if self.normalize:
+                norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+                pooled = pooled / np.clip(norms, 1e-12, None)
+
+            batches.append(pooled.astype(np.float32))
+
+        return np.vstack(batches)
+
+
+def export_onnx(
+    model_name: str = "all-MiniLM-L6-v2",
+    output_dir: str = "models/minilm-onnx",
+    quantize: bool = True
+) -> Path:
+    """
+    Export a SentenceTransformer model to ONNX (run once).
+
+    Writes the FP32 graph, an optional dynamically quantized int8
+    graph, the tokenizer files and a small config for OnnxEncoder.
+
+    Args:
+        model_name: HuggingFace model for embeddings
+        output_dir: Folder to write the exported model to
+        quantize: Also write the int8 model
+
+    Returns:
+        Path to the output folder
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    logger.info(f"📥 Loading {model_name} for export...")
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer, pooling = st_model[0], st_model[1]
+
+    # Only mean pooling is reproduced by OnnxEncoder
+    pooling_mode = getattr(pooling, 'pooling_mode', None)
+    if pooling_mode is None and getattr(pooling, 'pooling_mode_mean_tokens', False):
+        pooling_mode = "mean"
+    if pooling_mode != "mean":
+        raise ValueError(f"❌ Only mean pooling models can be exported (got {pooling_mode})")
+
+    tokenizer = transformer.tokenizer
+    hf_model = transformer.auto_model.eval()
+    tokenizer.save_pretrained(str(output_dir))
+
+    sample = tokenizer(["export sample text"], return_tensors="pt")
+    input_names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+
+    class _TokenEmbeddings(torch.nn.Module):
+        """Return only last_hidden_state so the graph has one output."""
+
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs))).last_hidden_state
+
+    fp32_path = output_dir / FP32_MODEL_FILE
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["token_embeddings"] = {0: "batch", 1: "sequence"}
+
+    logger.info("🔄 Exporting FP32 ONNX graph...")
+    with torch.no_grad():
+        torch.onnx.export(
+            _TokenEmbeddings(hf_model),
+            tuple(sample[n] for n in input_names),
+            str(fp32_path),
+            input_names=input_names,
+            output_names=["token_embeddings"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+            dynamo=False
+        )
+
+    if quantize:
+        try:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+        except ImportError:
+            raise ImportError("❌ onnxruntime is not installed. Run: pip install onnxruntime onnx")
+
+        logger.info("🔄 Quantizing to int8...")
+        quantize_dynamic(
+            str(fp32_path),
+            str(output_dir / INT8_MODEL_FILE),
+            weight_type=QuantType.QInt8
+        )
+
+    config = {
+        'model_name': model_name,
+        'max_seq_length': st_model.max_seq_length,
+        'normalize': any(type(m).__name__ == "Normalize" for m in st_model),
+        'dimension': hf_model.config.hidden_size
+    }
+    with open(output_dir / CONFIG_FILE, 'w') as f:
+        json.dump(config, f, indent=2)
+
+    logger.info(f"✅ ONNX model exported to {output_dir}/")
+    return output_dir
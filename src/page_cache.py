@@ -0,0 +1,84 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+# Extracted page text, keyed on (file hash, page, backend version), so a
+# rebuild only parses PDFs that changed or were never seen by the backend
+DEFAULT_CACHE_PATH = "data/cache/pdf_pages.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    file_hash TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    backend TEXT NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (file_hash, page, backend)
+);
+CREATE TABLE IF NOT EXISTS files (
+    file_hash TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    page_count INTEGER NOT NULL,
+    PRIMARY KEY (file_hash, backend)
+);
+"""
+
+
+def file_hash(path: Path) -> str:
+    """SHA-256 of the file contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PageCache:
+    """Persistent per-page text cache (SQLite)."""
+
+    def __init__(self, path: str = None):
+        """
+        Args:
+            path: Database file (default: PDF_PAGE_CACHE env var,
+                  else data/cache/pdf_pages.sqlite)
+        """
+        self.path = Path(path or os.getenv("PDF_PAGE_CACHE") or DEFAULT_CACHE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def get(self, digest: str, backend: str) -> Optional[List[str]]:
+        """All page texts of a file extracted before with this backend, else None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT page_count FROM files WHERE file_hash = ? AND backend = ?", (digest, backend)
+            ).fetchone()
+            if row is None:
+                return None
+            rows = self._conn.execute(
+                "SELECT text FROM pages WHERE file_hash = ? AND backend = ? ORDER BY page",
+                (digest, backend)
+            ).fetchall()
+
+        if len(rows) != row[0]:
+            return None
+        return [text for (text,) in rows]
+
+    def put(self, digest: str, backend: str, texts: List[str]):
+        """Store the text of every page of a file (page 1 first)."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)",
+                [(digest, n, backend, text) for n, text in enumerate(texts, start=1)]
+            )
+            # Written with the pages in one transaction: marks the file complete
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?)", (digest, backend, len(texts))
+            )
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,126 @@
+import os
+from importlib import metadata
+from pathlib import Path
+from typing import List
+
+# Names accepted by create_pdf_backend() / the PDF_BACKEND env var.
+# "auto" picks the fastest installed one.
+PDF_BACKENDS = ("pypdf2", "pymupdf", "pypdfium2")
+_FASTEST_FIRST = ("pymupdf", "pypdfium2", "pypdf2")
+
+
+def _dist_version(dist: str) -> str:
+    try:
+        return metadata.version(dist)
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+class PyPDF2Backend:
+    """PyPDF2 PdfReader.extract_text (pure Python, always installed)."""
+
+    name = "pypdf2"
+
+    def __init__(self):
+        from PyPDF2 import PdfReader
+        self._reader = PdfReader
+        # Part of the page cache key: a new version may extract differently
+        self.version = f"{self.name}-{_dist_version('PyPDF2')}"
+
+    def extract_pages(self, pdf_path: Path) -> List[str]:
+        """Text of every page, in order ("" for pages without text)."""
+        reader = self._reader(str(pdf_path))
+        return [page.extract_text() or "" for page in reader.pages]
+
+
+class PyMuPDFBackend:
+    """MuPDF through PyMuPDF (C, typically 10x+ faster than PyPDF2)."""
+
+    name = "pymupdf"
+
+    def __init__(self):
+        try:
+            import pymupdf
+        except ImportError:
+            try:
+                # Older releases only ship the fitz module
+                import fitz as pymupdf
+            except ImportError:
+                raise ImportError("❌ PyMuPDF is not installed. Run: pip install pymupdf")
+        self._pymupdf = pymupdf
+        self.version = f"{self.name}-{_dist_version('PyMuPDF')}"
+
+    def extract_pages(self, pdf_path: Path) -> List[str]:
+        with self._pymupdf.open(str(pdf_path)) as doc:
+            return [page.get_text() for page in doc]
+
+
+class PdfiumBackend:
+    """PDFium (Chrome's PDF engine) through pypdfium2."""
+
+    name = "pypdfium2"
+
+    def __init__(self):
+        try:
+            import pypdfium2
+        except ImportError:
+            raise ImportError("❌ pypdfium2 is not installed. Run: pip install pypdfium2")
+        self._pdfium = pypdfium2
+        self.version = f"{self.name}-{_dist_version('pypdfium2')}"
+
+    def extract_pages(self, pdf_path: Path) -> List[str]:
+        pdf = self._pdfium.PdfDocument(str(pdf_path))
+        try:
+            texts = []
+            for i in range(len(pdf)):
+                page = pdf[i]
+                textpage = page.get_textpage()
+                texts.append(textpage.get_text_range())
+                textpage.close()
+                page.close()
+            return texts
+        finally:
+            pdf.close()
+
+
+_CLASSES = {
+    "pypdf2": PyPDF2Backend,
+    "pymupdf": PyMuPDFBackend,
+    "pypdfium2": PdfiumBackend
+}
+
+
+def available_pdf_backends() -> List[str]:
+    """Backends whose library is installed."""
+    names = []
+    for name in PDF_BACKENDS:
+        try:
+            _CLASSES[name]()
+            names.append(name)
+        except ImportError:
+            pass
+    return names
+
+
+def create_pdf_backend(name: str = None):
+    """
+    Build a PDF text extraction backend.
+
+    Args:
+        name: "pypdf2", "pymupdf", "pypdfium2" or "auto"
+              (default: PDF_BACKEND env var, else "pypdf2").
+              Backends extract slightly different text, so switching
+              changes chunks; "auto" is for builds where speed matters more.
+    """
+    name = name or os.getenv("PDF_BACKEND", "pypdf2")
+
+    if name == "auto":
+        for candidate in _FASTEST_FIRST:
+            try:
+                return _CLASSES[candidate]()
+            except ImportError:
+                continue
+
+    if name not in _CLASSES:
+        raise ValueError(f"❌ Unknown PDF backend '{name}'. Use one of {PDF_BACKENDS} or 'auto'")
+    return _CLASSES[name]()
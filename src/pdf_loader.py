@@ -1,28 +1,60 @@
 import os
 from pathlib import Path
-from PyPDF2 import PdfReader
 from typing import List, Dict
+from pdf_backends import create_pdf_backend
+from page_cache import PageCache, file_hash
+from log_config import get_logger
+
+logger = get_logger("pdf_loader")
 
 class PDFLoader:
     """
     Simple PDF loader for RGPV RAG system.
     Loads PDFs from data/raw/ folder and extracts text.
+    PDFs in a subfolder (data/raw/<subject>/*.pdf) are tagged with
+    that subject; top-level PDFs use their file name as subject.
+    Extracted page text is cached, so unchanged PDFs are not re-parsed;
+    close() the loader (or use it as a context manager) when done.
     """
     
-    def __init__(self, data_dir: str = "data/raw"):
+    def __init__(
+        self,
+        data_dir: str = "data/raw",
+        backend: str = None,
+        use_cache: bool = True,
+        cache_path: str = None
+    ):
         """
         Initialize the PDF loader.
         
         Args:
             data_dir: Path to folder containing PDFs
+            backend: Text extraction backend (see pdf_backends;
+                     default: PDF_BACKEND env var, else "pypdf2")
+            use_cache: Reuse text extracted by earlier runs
+            cache_path: Page cache file (see page_cache.PageCache)
         """
         self.data_dir = Path(data_dir)
+        self.backend = create_pdf_backend(backend)
+        self.cache = PageCache(cache_path) if use_cache else None
         
         # Create directory if it doesn't exist
         if not self.data_dir.exists():
-            print(f"⚠️  Creating directory: {self.data_dir}")
+            logger.warning("⚠️  Creating directory: %s", self.data_dir)
             self.data_dir.mkdir(parents=True, exist_ok=True)
     
+    def close(self):
+        """Close the page cache database."""
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
     def load_pdfs(self) -> List[Dict[str, any]]:
         """
         Load all PDFs from the data directory.
@@ -32,8 +64,9 @@ class PDFLoader:
             [
                 {
                     'text': 'extracted text...',
-                    'source': 'filename.pdf',
-                    'page': 1
+                    'source': 'subject/filename.pdf',
+                    'page': 1,
+                    'subject': 'data_structure'
                 },
                 ...
             ]
@@ -41,35 +74,30 @@ class PDFLoader:
         documents = []
         
         # Find all PDF files
-        pdf_files = list(self.data_dir.glob("*.pdf"))
+        pdf_files = sorted(self.data_dir.rglob("*.pdf"))
         
         if not pdf_files:
-            print(f"❌ No PDF files found in {self.data_dir}")
-            print(f"   Please add PDFs to this folder and try again.")
+            logger.error("❌ No PDF files found in %s. Please add PDFs to this folder and try again.", self.data_dir)
             return documents
         
-        print(f"📚 Found {len(pdf_files)} PDF file(s)")
-        print("-" * 50)
+        logger.info("📚 Found %d PDF file(s)", len(pdf_files))
         
         # Process each PDF
         for pdf_path in pdf_files:
-            print(f"\n📄 Processing: {pdf_path.name}")
+            logger.info("📄 Processing: %s", pdf_path.name)
             
             try:
                 # Extract text from this PDF
                 pdf_docs = self._extract_text_from_pdf(pdf_path)
                 documents.extend(pdf_docs)
                 
-                print(f"   ✅ Extracted {len(pdf_docs)} pages")
+                logger.info("✅ %s: extracted %d pages", pdf_path.name, len(pdf_docs))
                 
             except Exception as e:
-                print(f"   ❌ Error: {str(e)}")
-                print(f"   ⚠️  Skipping this file...")
+                logger.error("❌ %s: %s - skipping this file", pdf_path.name, e)
                 continue
         
-        print("\n" + "=" * 50)
-        print(f"✅ Total pages extracted: {len(documents)}")
-        print("=" * 50)
+        logger.info("✅ Total pages extracted: %d", len(documents))
         
         return documents
     
@@ -85,24 +113,44 @@ class PDFLoader:
         """
         documents = []
         
-        # Read the PDF
-        reader = PdfReader(str(pdf_path))
+        # Subject = subfolder name, or file name for top-level PDFs
+        if pdf_path.parent == self.data_dir:
+            subject = pdf_path.stem
+        else:
+            subject = pdf_path.parent.name
         
-        # Extract text from each page
-        for page_num, page in enumerate(reader.pages, start=1):
-            # Extract text
-            text = page.extract_text()
-            
+        # Path relative to data_dir: subject folders may contain PDFs
+        # with the same file name (data_structure/pyq.pdf, operating_system/pyq.pdf)
+        source = pdf_path.relative_to(self.data_dir).as_posix()
+        
+        texts = self._page_texts(pdf_path)
+        
+        for page_num, text in enumerate(texts, start=1):
             # Only save if text exists and is not empty
             if text and text.strip():
                 documents.append({
                     'text': text.strip(),
-                    'source': pdf_path.name,
-                    'page': page_num
+                    'source': source,
+                    'page': page_num,
+                    'subject': subject
                 })
         
         return documents
-
+    
+    def _page_texts(self, pdf_path: Path) -> List[str]:
+        """Text of every page, from the cache if this file was seen before."""
+        if self.cache is None:
+            return self.backend.extract_pages(pdf_path)
+        
+        digest = file_hash(pdf_path)
+        texts = self.cache.get(digest, self.backend.version)
+        if texts is not None:
+            logger.info("⚡ %s: %d pages from cache", pdf_path.name, len(texts))
+            return texts
+        
+        texts = self.backend.extract_pages(pdf_path)
+        self.cache.put(digest, self.backend.version, texts)
+        return texts
 
 # ==========================================
 # TEST CODE (Run this file to test)
@@ -117,11 +165,9 @@ if __name__ == "__main__":
     print("🧪 TESTING PDF LOADER")
     print("=" * 50)
     
-    # Create loader
-    loader = PDFLoader(data_dir="data/raw")
-    
     # Load all PDFs
-    docs = loader.load_pdfs()
+    with PDFLoader(data_dir="data/raw") as loader:
+        docs = loader.load_pdfs()
     
     # Show results
     if docs:
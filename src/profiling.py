@@ -0,0 +1,157 @@
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+from log_config import get_logger
+import metrics
+
+logger = get_logger("profiling")
+
+# Opt-in profiling of single requests / build stages:
+#   RAG_PROFILE_RATE   fraction of requests profiled (default 0 = off)
+#   RAG_PROFILE_DIR    output folder (default profiles/)
+#   RAG_PROFILE_BUILD  "1" profiles every build_index() stage
+#   RAG_PROFILE_QUERY  "1" lets app users force a profile with ?profile=1
+#                      (off by default: the app may be public)
+#   RAG_PROFILE_KEEP   profiled runs kept in the folder (default 50,
+#                      oldest deleted first)
+# Each profiled run writes <name>.prof (load with pstats / snakeviz) and
+# <name>.txt (top functions by cumulative time + top allocations).
+DEFAULT_PROFILE_DIR = "profiles"
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 15
+
+# One profiled run at a time: cProfile and tracemalloc are per process
+_active = threading.Lock()
+_rng = random.Random()
+_run_ids = itertools.count(1)
+
+
+def sample_rate() -> float:
+    return float(os.getenv("RAG_PROFILE_RATE", "0"))
+
+
+def profile_dir() -> Path:
+    return Path(os.getenv("RAG_PROFILE_DIR", DEFAULT_PROFILE_DIR))
+
+
+def build_profiling_enabled() -> bool:
+    return os.getenv("RAG_PROFILE_BUILD", "0") == "1"
+
+
+def query_flag_allowed() -> bool:
+    """True if the operator lets requests ask for a profile."""
+    return os.getenv("RAG_PROFILE_QUERY", "0") == "1"
+
+
+def _rotate(directory: Path, keep: int):
+    """Delete the oldest runs beyond `keep` (.prof + .txt pairs)."""
+    runs = sorted(directory.glob("*.prof"), key=lambda p: p.stat().st_mtime)
+    for old in runs[:max(0, len(runs) - keep)]:
+        for path in (old, old.with_suffix(".txt")):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+@contextmanager
+def profile(name: str, force: bool = False):
+    """
+    Profile the block with cProfile and tracemalloc, if sampled.
+
+    cProfile sees the calling thread only: work handed to other threads
+    (embed batcher, shard search pool, LLM pool) shows up as waiting.
+
+    Args:
+        name: File name prefix (e.g. "answer", "build-embed")
+        force: Profile regardless of RAG_PROFILE_RATE (query flag)
+
+    Yields:
+        Dict that gets 'profile' and 'summary' file paths once the block
+        exits, or stays empty when this run was not profiled
+    """
+    report = {}
+    sampled = force or _rng.random() < sample_rate()
+    if not sampled or not _active.acquire(blocking=False):
+        if sampled:
+            metrics.increment("rag_profiles_total", result="busy")
+        yield report
+        return
+
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(25)
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield report
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - start
+        after = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if started_tracing:
+            tracemalloc.stop()
+
+        try:
+            report.update(_write(name, profiler, before, after, elapsed, current, peak))
+            metrics.increment("rag_profiles_total", result="written")
+        except OSError as e:
+            logger.error("❌ Could not write profile: %s", e)
+        finally:
+            _active.release()
+
+
+def _write(name: str, profiler: cProfile.Profile, before, after, elapsed: float, current: int, peak: int) -> Dict[str, str]:
+    """Dump the profile and a plain-text summary; returns their paths."""
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{os.getpid()}-{next(_run_ids)}"
+
+    prof_path = directory / f"{stem}.prof"
+    profiler.dump_stats(str(prof_path))
+
+    functions = io.StringIO()
+    pstats.Stats(profiler, stream=functions).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+
+    lines = [
+        f"{name}: {elapsed * 1000:.1f} ms wall, "
+        f"traced memory {current / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB",
+        "",
+        f"Top {TOP_ALLOCATIONS} allocations during the run (by line, net growth):"
+    ]
+    for stat in after.compare_to(before, "lineno")[:TOP_ALLOCATIONS]:
+        lines.append(f"  {stat}")
+    lines += ["", functions.getvalue()]
+
+    summary_path = directory / f"{stem}.txt"
+    summary_path.write_text("\n".join(lines), encoding='utf-8')
+    _rotate(directory, int(os.getenv("RAG_PROFILE_KEEP", "50")))
+
+    logger.info(f"🔬 Profile written: {prof_path} ({elapsed * 1000:.0f} ms)")
+    return {'profile': str(prof_path), 'summary': str(summary_path)}
+
+
+@contextmanager
+def build_stage(stage: str, enabled: Optional[bool] = None):
+    """Profile one build_index() stage when build profiling is on."""
+    if enabled is None:
+        enabled = build_profiling_enabled()
+    if not enabled:
+        yield {}
+        return
+    with profile(f"build-{stage}", force=True) as report:
+        yield report
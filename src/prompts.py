@@ -0,0 +1,170 @@
+import hashlib
+from typing import Dict, List, Union
+
+# Bump whenever the wording or layout below changes, so anything
+# caching on prompts (answer caches, provider prefix caches) rolls over
+PROMPT_VERSION = "2"
+
+# Stable prefix: identical for every request, so providers and local
+# backends can reuse their prefix / KV cache across questions
+SYSTEM_PROMPT = """You are an RGPV exam assistant helping students prepare for exams.
+Answer questions using ONLY the provided study material.
+
+RULES:
+- Use ONLY the information in the STUDY MATERIAL section
+- Include examples if they are mentioned in the material
+- Write naturally as if explaining to a student
+- Do NOT say "information not available" - if the material has relevant info, use it to answer
+- If the material truly has nothing relevant, then say "This topic is not covered in the provided material\""""
+
+# Per-marks answer format (appended to the system prompt, so each mode
+# still has its own fixed prefix)
+MARK_TEMPLATES = {
+    2: """FORMAT (2 marks):
+- Answer in 2-3 sentences (30-50 words)
+- Give the definition or key point only""",
+    5: """FORMAT (5 marks):
+- Write a clear, exam-style answer (100-150 words)
+- Structure your answer in a single well-organized paragraph""",
+    7: """FORMAT (7 marks):
+- Write an exam-style answer of 200-250 words
+- Start with a short definition, then explain in 2-3 paragraphs
+- End with an example or diagram description if the material has one""",
+    10: """FORMAT (10 marks):
+- Write a detailed exam-style answer of 350-450 words
+- Use headings: Introduction, Explanation, Example, Advantages/Limitations, Conclusion
+- Cover every relevant point from the material"""
+}
+
+
+# Per-marks generation budgets. Short answers retrieve fewer chunks,
+# send less context and stop earlier.
+#   top_k: chunks retrieved
+#   context_chars: max study-material characters in the prompt
+#   max_tokens: completion budget
+#   stop: stop sequences (the model must not start a new question)
+MARK_MODES = {
+    2: {'top_k': 2, 'context_chars': 3000, 'max_tokens': 100, 'stop': ["\n\n\n", "QUESTION:"]},
+    5: {'top_k': 3, 'context_chars': 7500, 'max_tokens': 300, 'stop': ["QUESTION:", "STUDY MATERIAL:"]},
+    7: {'top_k': 4, 'context_chars': 10000, 'max_tokens': 450, 'stop': ["QUESTION:", "STUDY MATERIAL:"]},
+    10: {'top_k': 6, 'context_chars': 15000, 'max_tokens': 700, 'stop': ["QUESTION:", "STUDY MATERIAL:"]}
+}
+
+
+def marks_mode(marks: int) -> int:
+    """Nearest supported marks mode at or below marks (minimum 2)."""
+    supported = [m for m in sorted(MARK_TEMPLATES) if m <= marks]
+    return supported[-1] if supported else min(MARK_TEMPLATES)
+
+
+def mode_settings(marks: int) -> Dict:
+    """Budgets for the marks mode closest to marks (see MARK_MODES)."""
+    return MARK_MODES[marks_mode(marks)]
+
+
+def fit_context(chunks: List[Dict], max_chars: int) -> List[Dict]:
+    """
+    Best-ranked chunks that fit in max_chars of text.
+    The top chunk is always kept (cut to max_chars if it is longer).
+
+    Args:
+        chunks: Retrieved chunks, best first
+        max_chars: Context budget
+
+    Returns:
+        Chunks to put in the prompt, best first
+    """
+    kept, used = [], 0
+    for chunk in chunks:
+        size = len(chunk['text'])
+        if used + size > max_chars:
+            if not kept:
+                kept.append({**chunk, 'text': chunk['text'][:max_chars]})
+            break
+        kept.append(chunk)
+        used += size
+    return kept
+
+
+def order_chunks(chunks: List[Dict]) -> List[Dict]:
+    """
+    Sort chunks by (source, page, chunk_id) so the same set of chunks
+    always produces the same context text, whatever the retrieval order.
+    """
+    return sorted(
+        chunks,
+        key=lambda c: (str(c.get('source', '')), c.get('page', 0), c.get('chunk_id', 0))
+    )
+
+
+def format_context(context: Union[str, List[Dict]]) -> str:
+    """Context block from retrieved chunks (or pre-joined text)."""
+    if isinstance(context, str):
+        return context.strip()
+
+    return "\n\n".join(
+        f"[{chunk.get('source', 'unknown')} p.{chunk.get('page', '?')}]\n{chunk['text'].strip()}"
+        for chunk in order_chunks(context)
+    )
+
+
+def build_messages(query: str, context: Union[str, List[Dict]], marks: int = 5) -> List[Dict]:
+    """
+    Chat messages for one question.
+
+    Layout, most stable first: system rules + marks format, then the
+    study material, then the question - so questions over the same
+    chunks share everything but the last few tokens.
+
+    Args:
+        query: User question
+        context: Retrieved chunks (dicts with 'text', 'source', 'page',
+                 'chunk_id') or already-joined text
+        marks: Answer weight (see MARK_TEMPLATES)
+
+    Returns:
+        [{'role': 'system', ...}, {'role': 'user', ...}]
+    """
+    system = f"{SYSTEM_PROMPT}\n\n{MARK_TEMPLATES[marks_mode(marks)]}"
+    user = f"STUDY MATERIAL:\n{format_context(context)}\n\nQUESTION: {query.strip()}\n\nANSWER:"
+
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": user}
+    ]
+
+
+def prompt_key(messages: List[Dict]) -> str:
+    """
+    Cache key for a prompt, including PROMPT_VERSION. LLMHandler keys
+    the stable prefix (messages[:1]) with it on every call.
+    """
+    digest = hashlib.sha256(PROMPT_VERSION.encode('utf-8'))
+    for message in messages:
+        digest.update(b"\0" + message['role'].encode('utf-8') + b"\0" + message['content'].encode('utf-8'))
+    return digest.hexdigest()
+
+
+# TEST
+if __name__ == "__main__":
+    print(f"🧪 TESTING PROMPT ASSEMBLY (v{PROMPT_VERSION})\n")
+
+    chunks = [
+        {'text': "Recursion is a technique where a function calls itself.", 'source': 'ds.pdf', 'page': 4, 'chunk_id': 2},
+        {'text': "Factorial: f(n) = n * f(n-1), f(0) = 1.", 'source': 'ds.pdf', 'page': 4, 'chunk_id': 3},
+        {'text': "A base case stops the recursion.", 'source': 'ds.pdf', 'page': 3, 'chunk_id': 1},
+    ]
+
+    first = build_messages("What is recursion?", chunks)
+    second = build_messages("Explain recursion with example.", list(reversed(chunks)))
+
+    a = first[0]['content'] + first[1]['content']
+    b = second[0]['content'] + second[1]['content']
+    shared = next((i for i, (x, y) in enumerate(zip(a, b)) if x != y), min(len(a), len(b)))
+
+    print(f"Prompt length: {len(a)} / {len(b)} chars")
+    print(f"Shared prefix: {shared} chars ({shared / len(a):.0%})")
+    print(f"Keys: {prompt_key(first)[:12]} / {prompt_key(second)[:12]}\n")
+    print(first[0]['content'])
+    print('-' * 60)
+    print(first[1]['content'])
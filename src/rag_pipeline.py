@@ -1,25 +1,75 @@
+import os
+import threading
 import time
-from retriever import Retriever
-from llm_handler import LLMHandler
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List
+from metadata_index import chunk_key, read_store_info
+from prompts import fit_context, mode_settings
+from sessions import Session, SessionStore, is_follow_up
+from mmr import mmr_select
+from log_config import get_logger
+import metrics
+import profiling
+
+logger = get_logger("rag_pipeline")
+
+# Heavy modules (torch, faiss, groq) are imported by the component
+# factories below, not at import time, so the UI can start immediately.
+
+# Artificial "searching..." pause per question for demos, in seconds
+# (RAG_DEMO_DELAY_S, default 0 = off)
+DEMO_DELAY_ENV = "RAG_DEMO_DELAY_S"
 
 class RAGPipeline:
     """Main RAG pipeline - DEMO MODE with preset answers."""
     
-    def __init__(self):
-        """Initialize retriever and LLM."""
-        print("🔧 Initializing RAG Pipeline...")
+    def __init__(
+        self,
+        lazy: bool = False,
+        warm_up: bool = False,
+        vector_store_path: str = "data/processed",
+        retriever=None,
+        llm=None,
+        answer_bank: bool = True
+    ):
+        """
+        Initialize retriever and LLM.
         
-        try:
-            self.retriever = Retriever()
-        except Exception as e:
-            print(f"⚠️ Retriever initialization failed: {e}")
-            self.retriever = None
+        Args:
+            lazy: Defer loading the retriever and LLM until first use
+            warm_up: With lazy=True, load them in a background thread
+            vector_store_path: Path to saved FAISS index
+            retriever: Use this retriever instead of building one
+            llm: Use this LLM handler instead of building one
+                 (e.g. a stub for benchmarks)
+            answer_bank: Serve pre-generated answers to previous-year
+                         questions when available (see answer_bank.py)
+        """
+        logger.info("🔧 Initializing RAG Pipeline...")
         
-        try:
-            self.llm = LLMHandler()
-        except Exception as e:
-            print(f"⚠️ LLM initialization failed: {e}")
-            self.llm = None
+        self.vector_store_path = vector_store_path
+        
+        # name -> loaded component (None if loading failed)
+        self._components = {}
+        if retriever is not None:
+            self._components['retriever'] = retriever
+        if llm is not None:
+            self._components['llm'] = llm
+        if not answer_bank:
+            self._components['answer_bank'] = None
+        self._component_locks = {
+            'retriever': threading.Lock(),
+            'llm': threading.Lock(),
+            'answer_bank': threading.Lock()
+        }
+        
+        # Per-user conversation state for follow-up questions
+        self.sessions = SessionStore()
+        
+        if not lazy:
+            self.load_components()
+        elif warm_up:
+            threading.Thread(target=self.warm_up, name="rag-warm-up", daemon=True).start()
         
         # DEMO MODE: Preset Q&A pairs
         self.demo_qa = {
@@ -185,107 +235,578 @@ iv) Postfix expression evaluation""",
             }
         }
         
-        print("✅ RAG Pipeline ready (Demo Mode)")
+        logger.info("✅ RAG Pipeline ready (Demo Mode)")
+    
+    def _component(self, name: str, factory):
+        """Build a component once, thread-safely; None if it fails."""
+        if name in self._components:
+            return self._components[name]
+        
+        with self._component_locks[name]:
+            if name not in self._components:
+                try:
+                    self._components[name] = factory()
+                except Exception as e:
+                    logger.warning("⚠️ %s initialization failed: %s", name.capitalize(), e)
+                    self._components[name] = None
+            return self._components[name]
     
-    def answer_question(self, query: str, top_k: int = 3, score_threshold: float = 1.5):
+    def _make_retriever(self):
+        # Use the shared retrieval service when one is configured
+        service_url = os.getenv("RETRIEVAL_SERVICE_URL")
+        if service_url:
+            from retrieval_service import RetrievalClient
+            return RetrievalClient(service_url)
+        
+        from retriever import Retriever
+        return Retriever(self.vector_store_path)
+    
+    def _make_llm(self):
+        # Backend(s) come from LLM_BACKEND (see llm_backends.create_router)
+        from llm_handler import LLMHandler
+        return LLMHandler()
+    
+    def _make_answer_bank(self):
+        from answer_bank import AnswerBank
+        return AnswerBank.load(os.path.join(self.vector_store_path, "answer_bank"))
+    
+    @property
+    def answer_bank(self):
+        """Pre-generated PYQ answers (None if not built)."""
+        return self._component('answer_bank', self._make_answer_bank)
+    
+    @property
+    def retriever(self):
+        """Retriever (loaded on first access)."""
+        return self._component('retriever', self._make_retriever)
+    
+    @property
+    def llm(self):
+        """LLM handler (created on first access)."""
+        return self._component('llm', self._make_llm)
+    
+    def load_components(self):
+        """Load the retriever and LLM now (blocks)."""
+        return self.retriever, self.llm
+    
+    def warm_up(self):
+        """Load every component and run one embedding to fault in the model."""
+        start = time.perf_counter()
+        
+        retriever, _ = self.load_components()
+        
+        embedder = getattr(retriever, 'embedder', None)
+        if embedder is not None:
+            embedder.embed_query("warm up")
+        
+        logger.info(f"🔥 Pipeline warmed up in {time.perf_counter() - start:.2f}s")
+    
+    def index_info(self) -> Dict:
+        """
+        Index metric and subjects for the UI.
+        Read from the saved store files unless the retriever is
+        already loaded, so this never triggers a model load.
+        """
+        retriever = self._components.get('retriever')
+        if retriever is None and os.getenv("RETRIEVAL_SERVICE_URL"):
+            retriever = self.retriever
+        if retriever is not None:
+            return {'metric': retriever.metric, 'subjects': retriever.list_subjects()}
+        
+        return read_store_info(self.vector_store_path)
+    
+    def answer_question(
+        self,
+        query: str,
+        top_k: int = None,
+        score_threshold: float = None,
+        subject: str = None,
+        marks: int = 5,
+        profile: bool = False,
+        session_id: str = None,
+        follow_up: bool = None
+    ):
         """
         Answer question using RAG - DEMO MODE.
         
         Args:
             query: User question
-            top_k: Number of chunks to retrieve
-            score_threshold: Similarity threshold
+            top_k: Number of chunks to retrieve (None = marks mode default)
+            score_threshold: Relevance threshold (see Retriever.retrieve,
+                             None = retriever default for the index metric)
+            subject: Only search this subject (None = all)
+            marks: Answer weight - 2, 5, 7 or 10 (sets answer length,
+                   context size and token budget, see prompts.MARK_MODES)
+            profile: Profile this request (cProfile + tracemalloc); without
+                     it a RAG_PROFILE_RATE fraction of requests is profiled
+            session_id: Conversation this question belongs to. Follow-ups
+                        ("give an example") are answered from the previous
+                        turn's chunks instead of a fresh index search
+            follow_up: True = continue the session's topic, False = start
+                       a new one, None = detect explicit references
+                       ("give an example", "explain that")
         
         Returns:
-            dict with 'found', 'answer', 'sources'
+            dict with 'found', 'answer', 'sources' and 'timings'
+            (seconds spent per stage for this request), plus 'profile'
+            (written file paths) when the request was profiled and
+            'follow_up' when a session_id was given
         """
-        print(f"\n🔍 Processing query: {query}")
+        with profiling.profile("answer", force=profile) as report:
+            with metrics.trace() as timings:
+                with metrics.span("answer_total"):
+                    result = self._answer(query, top_k, score_threshold, subject, marks, session_id, follow_up)
+        
+        metrics.increment("rag_requests_total", outcome=result.pop('outcome'))
+        result['timings'] = timings
+        if report:
+            result['profile'] = report
+        return result
+    
+    def _answer(
+        self,
+        query: str,
+        top_k: int,
+        score_threshold: float,
+        subject: str,
+        marks: int,
+        session_id: str = None,
+        follow_up: bool = None
+    ) -> Dict:
+        """answer_question() without instrumentation; adds an 'outcome' key."""
+        logger.debug("🔍 Processing query: %s", query)
         
-        # Simulate search delay for realism
-        time.sleep(1)
+        # Simulate search delay for realism (demos only)
+        demo_delay = float(os.getenv(DEMO_DELAY_ENV, "0"))
+        if demo_delay > 0:
+            with metrics.span("demo_delay"):
+                time.sleep(demo_delay)
         
         # Check if query matches demo Q&A
-        query_lower = query.lower().strip()
+        with metrics.span("cache_lookup"):
+            demo_data = self._demo_answer(query)
         
-        for demo_q, demo_data in self.demo_qa.items():
-            if demo_q in query_lower:
-                print(f"✅ Found in demo knowledge base")
-                return {
-                    'found': True,
-                    'answer': demo_data['answer'],
-                    'sources': demo_data['sources']
-                }
+        if demo_data is not None:
+            logger.debug("✅ Found in demo knowledge base")
+            return {
+                'found': True,
+                'answer': demo_data['answer'],
+                'sources': demo_data['sources'],
+                'outcome': 'demo'
+            }
         
         # If not in demo Q&A, try real retrieval
         if self.retriever is None:
-            print("❌ Retriever not available")
+            logger.warning("❌ Retriever not available")
             return {
                 'found': False,
                 'answer': 'Vector store not initialized. Please ask about Data Structure previous year questions.',
-                'sources': []
+                'sources': [],
+                'outcome': 'no_retriever'
             }
         
         try:
-            print("🔍 Searching vector database...")
-            chunks = self.retriever.retrieve(query, top_k=top_k, score_threshold=score_threshold)
+            logger.debug("🔍 Searching vector database...")
+            settings = mode_settings(marks)
+            top_k = top_k or settings['top_k']
+            
+            # The answer bank and sessions need the query embedding, so
+            # embed once and reuse it for the search
+            bank = self.answer_bank
+            embedder = getattr(self.retriever, 'embedder', None)
+            entry = None
+            if session_id is not None and not self._supports_sessions():
+                session_id = None
+            session = self._follow_up_session(session_id, query, subject, follow_up)
+            
+            if session is not None:
+                chunks = self._follow_up(session, query, top_k, score_threshold)
+                # A vague follow-up is answered in the context of the topic
+                query = f"{session.query}\nFollow-up: {query}"
+            elif (bank is not None or session_id is not None) and embedder is not None:
+                with metrics.span("embed"):
+                    query_embedding = embedder.embed_query(query)
+                if bank is not None:
+                    with metrics.span("answer_bank_lookup"):
+                        entry = bank.match(query_embedding, marks)
+                    if entry is None:
+                        metrics.increment("rag_answer_bank_total", result="miss")
+                if session_id is not None:
+                    chunks = self._start_session(session_id, query, query_embedding, top_k, score_threshold, subject)
+                else:
+                    chunks = self.retriever.search_embeddings(
+                        query_embedding[None, :], top_k, score_threshold, subject=subject
+                    )[0]
+            else:
+                chunks = self.retriever.retrieve(
+                    query, top_k=top_k, score_threshold=score_threshold, subject=subject
+                )
+            chunks = fit_context(chunks, settings['context_chars'])
+            
+            # Banked answer, unless the chunks it was written from changed
+            if entry is not None:
+                if bank.is_current(entry, chunks):
+                    logger.debug("📒 Answer bank hit: %s", entry['question'])
+                    metrics.increment("rag_answer_bank_total", result="hit")
+                    return {
+                        'found': True,
+                        'answer': entry['answer'],
+                        'sources': entry['sources'],
+                        'outcome': 'answer_bank',
+                        **self._session_info(session_id, session)
+                    }
+                metrics.increment("rag_answer_bank_total", result="stale")
             
             if not chunks:
-                print("❌ No relevant chunks found")
+                logger.debug("❌ No relevant chunks found")
                 return {
                     'found': False,
                     'answer': 'No relevant information found in study material.',
-                    'sources': []
+                    'sources': [],
+                    'outcome': 'not_found',
+                    **self._session_info(session_id, session)
                 }
             
-            # Build context from chunks
-            context = "\n\n".join([chunk['text'] for chunk in chunks])
-            
             # Generate answer
             if self.llm is None:
-                print("❌ LLM not available, returning raw chunks")
+                logger.warning("❌ LLM not available, returning raw chunks")
                 return {
                     'found': True,
-                    'answer': "LLM not available. Here are the relevant sections:\n\n" + context[:500],
-                    'sources': [
-                        {
-                            'text': chunk['text'],
-                            'page': chunk.get('page', 'Unknown'),
-                            'score': chunk['score']
-                        }
-                        for chunk in chunks
-                    ]
+                    'answer': self._raw_sections(chunks),
+                    'sources': self._format_sources(chunks),
+                    'outcome': 'no_llm',
+                    **self._session_info(session_id, session)
                 }
             
-            print("🤖 Generating answer...")
-            answer = self.llm.generate_answer(query, context)
-            
-            # Format sources
-            sources = [
-                {
-                    'text': chunk['text'],
-                    'page': chunk.get('page', 'Unknown'),
-                    'score': chunk['score']
-                }
-                for chunk in chunks
-            ]
+            logger.debug("🤖 Generating answer...")
+            answer = self.llm.generate_answer(query, chunks, marks)
             
             return {
                 'found': True,
                 'answer': answer,
-                'sources': sources
+                'sources': self._format_sources(chunks),
+                'outcome': 'answered',
+                **self._session_info(session_id, session)
             }
         
         except Exception as e:
-            print(f"❌ Error during retrieval: {e}")
+            logger.error("❌ Error during retrieval: %s", e)
             return {
                 'found': False,
                 'answer': f'Error during search: {str(e)}',
-                'sources': []
+                'sources': [],
+                'outcome': 'error'
+            }
+
+    
+    def _supports_sessions(self) -> bool:
+        """
+        Sessions need a local cosine Retriever: cached candidates are
+        re-ranked by cosine similarity and read back with candidates()
+        (RetrievalClient has neither).
+        """
+        retriever = self.retriever
+        return (
+            getattr(retriever, 'metric', None) == "cosine"
+            and all(hasattr(retriever, name) for name in ('candidates', 'version', 'embedder', 'mmr_lambda', 'mmr_fetch'))
+        )
+    
+    def _follow_up_session(self, session_id: str, query: str, subject: str, follow_up: bool = None):
+        """The session to continue, if this question is a follow-up in it."""
+        if session_id is None or follow_up is False:
+            return None
+        if follow_up is None and not is_follow_up(query):
+            return None
+        session = self.sessions.get(session_id)
+        if session is None or session.subject != subject or session.version != self.retriever.version:
+            return None
+        return session
+    
+    def _start_session(
+        self,
+        session_id: str,
+        query: str,
+        query_embedding,
+        top_k: int,
+        score_threshold: float,
+        subject: str
+    ) -> List[Dict]:
+        """
+        Search for a new topic and remember the query and an over-fetched
+        candidate set for later follow-ups.
+        """
+        limit = self.sessions.max_candidates
+        fetch = top_k * self.retriever.mmr_fetch if self._diversify_sessions() else top_k
+        with metrics.span("search"):
+            results, vectors, version = self.retriever.candidates(
+                query_embedding, max(fetch, limit), score_threshold, subject=subject
+            )
+        
+        session = Session(query, query_embedding, subject, version)
+        session.extend(results, vectors, limit)
+        self.sessions.put(session_id, session)
+        metrics.increment("rag_session_turns_total", kind="new")
+        
+        if not self._diversify_sessions() or len(results) <= 1:
+            return results[:top_k]
+        # Same pick as Retriever.retrieve(): MMR over the best top_k x mmr_fetch
+        with metrics.span("mmr"):
+            picked = mmr_select(query_embedding, vectors[:fetch], top_k, self.retriever.mmr_lambda)
+        return [results[i] for i in picked]
+    
+    def _diversify_sessions(self) -> bool:
+        """True if the retriever picks results with MMR by default."""
+        mmr_lambda = self.retriever.mmr_lambda
+        return mmr_lambda is not None and mmr_lambda < 1
+    
+    def _follow_up(self, session, query: str, top_k: int, score_threshold: float) -> List[Dict]:
+        """
+        Chunks for a follow-up: the session's cached candidates re-ranked
+        against the topic moved towards the follow-up. The index is only
+        searched (and the candidates extended) when too few of them match.
+        """
+        from retriever import DEFAULT_THRESHOLDS
+        min_score = DEFAULT_THRESHOLDS['cosine'] if score_threshold is None else score_threshold
+        
+        with metrics.span("embed"):
+            topic = session.follow(self.retriever.embedder.embed_query(query))
+        mmr = (self.retriever.mmr_lambda, self.retriever.mmr_fetch)
+        with metrics.span("session_rank"):
+            chunks = session.rank(top_k, min_score, *mmr)
+        
+        if len(chunks) >= top_k:
+            metrics.increment("rag_session_turns_total", kind="reused")
+            return chunks
+        
+        with metrics.span("search"):
+            results, vectors, _ = self.retriever.candidates(
+                topic, max(top_k, self.sessions.max_candidates), score_threshold, subject=session.subject
+            )
+        session.extend(results, vectors, self.sessions.max_candidates)
+        metrics.increment("rag_session_turns_total", kind="extended")
+        return session.rank(top_k, min_score, *mmr)
+    
+    @staticmethod
+    def _session_info(session_id: str, session) -> Dict:
+        return {} if session_id is None and session is None else {'follow_up': session is not None}
+    
+    def end_session(self, session_id: str):
+        """Forget a conversation (next question starts a new topic)."""
+        self.sessions.drop(session_id)
+    
+    @staticmethod
+    def _raw_sections(chunks: List[Dict]) -> str:
+        """Answer text used when no LLM is available."""
+        return "LLM not available. Here are the relevant sections:\n\n" + "\n\n".join(
+            f"**Page {chunk.get('page', '?')}:** {chunk['text']}" for chunk in chunks
+        )
+    
+    @staticmethod
+    def _format_sources(chunks: List[Dict]) -> List[Dict]:
+        return [
+            {
+                'text': chunk['text'],
+                'page': chunk.get('page', 'Unknown'),
+                'score': chunk['score'],
+                'chunk_key': chunk_key(chunk)
             }
+            for chunk in chunks
+        ]
+    
+    def _demo_answer(self, query: str):
+        """Preset demo entry matching the query, or None."""
+        query_lower = query.lower().strip()
+        return next(
+            (data for demo_q, data in self.demo_qa.items() if demo_q in query_lower),
+            None
+        )
+    
+    def answer_batch(
+        self,
+        questions: List[str],
+        top_k: int = None,
+        score_threshold: float = None,
+        subject: str = None,
+        marks: int = 5,
+        max_concurrency: int = None
+    ) -> Iterator[Dict]:
+        """
+        Answer many questions (e.g. a whole previous-year paper).
+        
+        All questions are embedded in one batch and searched in one
+        FAISS call; repeated questions are answered once and each
+        distinct chunk is stored once. LLM calls run concurrently.
+        
+        Args:
+            questions: Questions to answer
+            top_k, score_threshold, subject, marks: As in answer_question()
+            max_concurrency: Max LLM calls in flight
+                             (default: LLM_MAX_CONCURRENCY env var, else 4)
+        
+        Yields:
+            One answer_question()-style dict per question (plus
+            'question' and 'outcome'), in input order, as soon as that
+            answer (and all before it) is ready
+        """
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+        
+        # Identical questions are answered once
+        unique = list(dict.fromkeys(q.strip() for q in questions))
+        
+        # Demo answers need no retrieval
+        demo = {q: self._demo_answer(q) for q in unique}
+        pending = [q for q in unique if demo[q] is None]
+        
+        settings = mode_settings(marks)
+        retrieved, banked, error = {}, {}, None
+        if pending and self.retriever is not None:
+            try:
+                # The answer bank needs the query embeddings: embed once
+                bank = self.answer_bank
+                embedder = getattr(self.retriever, 'embedder', None)
+                with metrics.span("batch_retrieve"):
+                    if bank is not None and embedder is not None:
+                        with metrics.span("embed"):
+                            embeddings = embedder.embed_queries(pending)
+                        with metrics.span("answer_bank_lookup"):
+                            banked = {q: bank.match(e, marks) for q, e in zip(pending, embeddings)}
+                        batches = self.retriever.search_embeddings(
+                            embeddings, top_k or settings['top_k'], score_threshold, subject=subject
+                        )
+                    else:
+                        batches = self.retriever.retrieve_batch(
+                            pending, top_k=top_k or settings['top_k'], score_threshold=score_threshold, subject=subject
+                        )
+            except Exception as e:
+                logger.error("❌ Error during batch retrieval: %s", e)
+                error = e
+            else:
+                # Questions on the same topic share chunks; keep one copy of each
+                shared = {}
+                for query, chunks in zip(pending, batches):
+                    retrieved[query] = list({
+                        chunk_key(c): shared.setdefault(chunk_key(c), c) for c in chunks
+                    }.values())
+                logger.info(
+                    "📦 Batch retrieval: %d questions, %d distinct chunks",
+                    len(pending), len(shared)
+                )
+        
+        def solve(query: str) -> Dict:
+            if demo[query] is not None:
+                return {
+                    'found': True,
+                    'answer': demo[query]['answer'],
+                    'sources': demo[query]['sources'],
+                    'outcome': 'demo'
+                }
+            if self.retriever is None:
+                return {
+                    'found': False,
+                    'answer': 'Vector store not initialized. Please ask about Data Structure previous year questions.',
+                    'sources': [],
+                    'outcome': 'no_retriever'
+                }
+            if error is not None:
+                return {
+                    'found': False,
+                    'answer': f'Error during search: {str(error)}',
+                    'sources': [],
+                    'outcome': 'error'
+                }
+            
+            chunks = fit_context(retrieved[query], settings['context_chars'])
+            
+            # Banked answer, unless the chunks it was written from changed
+            entry = banked.get(query)
+            if entry is not None and self.answer_bank.is_current(entry, chunks):
+                metrics.increment("rag_answer_bank_total", result="hit")
+                return {
+                    'found': True,
+                    'answer': entry['answer'],
+                    'sources': entry['sources'],
+                    'outcome': 'answer_bank'
+                }
+            if banked:
+                metrics.increment("rag_answer_bank_total", result="miss" if entry is None else "stale")
+            
+            if not chunks:
+                return {
+                    'found': False,
+                    'answer': 'No relevant information found in study material.',
+                    'sources': [],
+                    'outcome': 'not_found'
+                }
+            
+            if self.llm is None:
+                return {
+                    'found': True,
+                    'answer': self._raw_sections(chunks),
+                    'sources': self._format_sources(chunks),
+                    'outcome': 'no_llm'
+                }
+            
+            return {
+                'found': True,
+                'answer': self.llm.generate_answer(query, chunks, marks),
+                'sources': self._format_sources(chunks),
+                'outcome': 'answered'
+            }
+        
+        # The pool bounds how many calls are in flight; LLMHandler's
+        # shared RateLimiter keeps them within the request budget and
+        # pauses all of them after a 429
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="rag-batch") as pool:
+            futures = {query: pool.submit(solve, query) for query in unique}
+            
+            for question in questions:
+                result = dict(futures[question.strip()].result())
+                metrics.increment("rag_requests_total", outcome=result['outcome'])
+                result['question'] = question
+                yield result
 
 
-# TEST
+# TEST / BATCH
 if __name__ == "__main__":
+    import sys
+    
+    # Solve a whole paper: one question per line (file or stdin)
+    #   python src/rag_pipeline.py batch questions.txt [marks]
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        path = sys.argv[2] if len(sys.argv) > 2 else "-"
+        marks = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+        with (sys.stdin if path == "-" else open(path, encoding="utf-8")) as f:
+            questions = [line.strip() for line in f if line.strip()]
+        
+        pipeline = RAGPipeline()
+        start = time.perf_counter()
+        
+        for i, result in enumerate(pipeline.answer_batch(questions, marks=marks), 1):
+            print(f"\n{'='*70}\n❓ Q{i}: {result['question']}\n{'='*70}")
+            print(result['answer'])
+        
+        print(f"\n✅ Answered {len(questions)} questions in {time.perf_counter() - start:.2f}s")
+        sys.exit(0)
+    
+    # A new session topic must retrieve what a plain search retrieves
+    #   python src/rag_pipeline.py sessions ["question"]
+    if len(sys.argv) > 1 and sys.argv[1] == "sessions":
+        query = sys.argv[2] if len(sys.argv) > 2 else "Explain binary search tree insertion"
+        pipeline = RAGPipeline(answer_bank=False)
+        if not pipeline._supports_sessions():
+            print("⚠️  Sessions need a cosine vector store (python src/retriever.py build)")
+            sys.exit(1)
+        
+        for mmr_lambda in (None, 0.5):
+            pipeline.retriever.mmr_lambda = mmr_lambda
+            plain = pipeline.retriever.retrieve(query, top_k=5)
+            embedding = pipeline.retriever.embedder.embed_query(query)
+            session = pipeline._start_session("check", query, embedding, 5, None, None)
+            assert [chunk_key(c) for c in session] == [chunk_key(c) for c in plain], mmr_lambda
+            print(f"✅ mmr_lambda={mmr_lambda}: session turn matches retrieve() ({len(plain)} chunks)")
+        sys.exit(0)
+    
     print("🧪 TESTING RAG PIPELINE (DEMO MODE)\n")
     
     try:
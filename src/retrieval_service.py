@@ -0,0 +1,298 @@
+import http.client
+import json
+import queue
+import threading
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Tuple
+from urllib.parse import urlparse
+from micro_batcher import MicroBatcher
+from log_config import get_logger
+import metrics
+
+logger = get_logger("retrieval_service")
+
+
+class RetrievalService:
+    """
+    Shares one Retriever (embedder + index) between many callers.
+    Query embeddings from concurrent requests are micro-batched into
+    a single forward pass; the index search stays per request.
+    """
+
+    def __init__(self, retriever, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        """
+        Args:
+            retriever: Loaded Retriever
+            max_batch_size: Max queries per embedding pass
+            max_wait_ms: How long a query waits for others to batch with
+        """
+        self.retriever = retriever
+        self.batcher = MicroBatcher(
+            self._embed_batch,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            name="embed-batcher"
+        )
+
+    def _embed_batch(self, queries: List[str]) -> List[Tuple[object, np.ndarray]]:
+        """Embed with the live embedder (it changes on an index swap)."""
+        embedder = self.retriever.embedder
+        return [(embedder, row) for row in embedder.embed_queries(queries)]
+
+    def retrieve_many(
+        self,
+        queries: List[str],
+        top_k: int = 3,
+        score_threshold: float = None,
+        **filters
+    ) -> List[List[Dict]]:
+        """Embed (batched with other callers) and search, both on one index version."""
+        with self.retriever.pinned() as handle:
+            with metrics.span("embed"):
+                embedded = self.batcher.submit_many(queries)
+                if all(embedder is handle.embedder for embedder, _ in embedded):
+                    embeddings = np.vstack([row for _, row in embedded])
+                else:
+                    # Batched during a swap to a version with another model
+                    embeddings = handle.embedder.embed_queries(queries)
+            return self.retriever.search_embeddings(
+                embeddings, top_k, score_threshold, handle=handle, **filters
+            )
+
+    def info(self) -> Dict:
+        """Index details for clients."""
+        return {
+            'status': 'ok',
+            'metric': self.retriever.metric,
+            'subjects': self.retriever.list_subjects(),
+            'batches': self.batcher.batches,
+            'queries': self.batcher.items
+        }
+
+
+def _make_handler(service: RetrievalService):
+    """Request handler bound to one service."""
+
+    class RetrievalHandler(BaseHTTPRequestHandler):
+        # Keep-alive so clients can reuse connections
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, status: int, payload: Dict):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, service.info())
+            elif self.path == "/metrics":
+                body = metrics.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path != "/retrieve":
+                self._send_json(404, {'error': 'not found'})
+                return
+
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+
+                # {"query": "..."} or {"queries": [...]}
+                single = 'query' in request
+                queries = [request['query']] if single else request['queries']
+                page_range = request.get('page_range')
+
+                results = service.retrieve_many(
+                    queries,
+                    top_k=request.get('top_k', 3),
+                    score_threshold=request.get('score_threshold'),
+                    subject=request.get('subject'),
+                    sources=request.get('sources'),
+                    page_range=tuple(page_range) if page_range else None
+                )
+                self._send_json(200, {'results': results[0] if single else results})
+
+            except (KeyError, ValueError, TypeError) as e:
+                self._send_json(400, {'error': f"bad request: {e}"})
+            except Exception as e:
+                self._send_json(500, {'error': str(e)})
+
+        def log_message(self, format, *args):
+            # Per-request access logs are too noisy on the hot path
+            pass
+
+    return RetrievalHandler
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    vector_store_path: str = "data/processed",
+    max_batch_size: int = 32,
+    max_wait_ms: float = 5.0
+) -> ThreadingHTTPServer:
+    """
+    Create the retrieval HTTP server (call serve_forever() to run it).
+
+    Endpoints:
+        GET  /health    index info + batching counters
+        GET  /metrics   Prometheus text (stage latencies, counters)
+        POST /retrieve  {"query" | "queries", "top_k", "score_threshold",
+                         "subject", "sources", "page_range"}
+    """
+    from retriever import Retriever
+
+    service = RetrievalService(
+        Retriever(vector_store_path), max_batch_size=max_batch_size, max_wait_ms=max_wait_ms
+    )
+    server = ThreadingHTTPServer((host, port), _make_handler(service))
+    server.daemon_threads = True
+    logger.info(f"🌐 Retrieval service listening on http://{host}:{server.server_address[1]}")
+    return server
+
+
+class RetrievalClient:
+    """
+    Thin HTTP client with the same retrieve() interface as Retriever.
+    Keeps a pool of keep-alive connections to the service.
+    """
+
+    def __init__(self, base_url: str = "http://127.0.0.1:8765", pool_size: int = 8, timeout: float = 30.0):
+        """
+        Args:
+            base_url: Retrieval service address
+            pool_size: Max idle connections kept open
+            timeout: Socket timeout in seconds
+        """
+        parsed = urlparse(base_url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+        info = self._request("GET", "/health")
+        self.metric = info['metric']
+        self._subjects = info['subjects']
+        logger.info(f"✅ Connected to retrieval service at {base_url} ({self.metric})")
+
+    def _request(self, method: str, path: str, payload: Dict = None) -> Dict:
+        """Send one request on a pooled connection (retried once if stale)."""
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body else {}
+
+        for attempt in range(2):
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = json.loads(response.read())
+            except Exception as e:
+                # Never pool a connection in an unknown state (half-read
+                # response, bad JSON, timeout)
+                conn.close()
+                # Server closed an idle keep-alive connection: retry once
+                if attempt == 0 and isinstance(e, (http.client.HTTPException, OSError)):
+                    continue
+                raise
+
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+            if response.status != 200:
+                raise RuntimeError(f"❌ Retrieval service error ({response.status}): {data.get('error')}")
+            return data
+
+    def list_subjects(self) -> List[str]:
+        """Subjects that can be passed to retrieve()."""
+        return self._subjects
+
+    def retrieve(
+        self,
+        query: str,
+        top_k: int = 3,
+        score_threshold: float = None,
+        subject: str = None,
+        sources: List[str] = None,
+        page_range: Tuple[int, int] = None
+    ) -> List[Dict]:
+        """Same as Retriever.retrieve(), served remotely."""
+        return self._request("POST", "/retrieve", {
+            'query': query, 'top_k': top_k, 'score_threshold': score_threshold,
+            'subject': subject, 'sources': sources, 'page_range': page_range
+        })['results']
+
+    def retrieve_batch(
+        self,
+        queries: List[str],
+        top_k: int = 3,
+        score_threshold: float = None,
+        **filters
+    ) -> List[List[Dict]]:
+        """Same as Retriever.retrieve_batch(), served remotely."""
+        return self._request("POST", "/retrieve", {
+            'queries': queries, 'top_k': top_k, 'score_threshold': score_threshold, **filters
+        })['results']
+
+    def close(self):
+        """Close pooled connections."""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+# RUN SERVICE / TEST
+if __name__ == "__main__":
+    import argparse
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    parser = argparse.ArgumentParser(description="Retrieval service")
+    parser.add_argument("command", choices=["serve", "test"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--store", default="data/processed")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.host, args.port, args.store).serve_forever()
+    else:
+        print("🧪 TESTING RETRIEVAL SERVICE (localhost)\n")
+
+        # Port 0 = any free port
+        server = serve(args.host, 0, args.store)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        client = RetrievalClient(f"http://{args.host}:{server.server_address[1]}")
+        queries = ["What is a data structure?", "Explain arrays", "What is time complexity?"] * 10
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            results = list(pool.map(lambda q: client.retrieve(q, top_k=3), queries))
+        elapsed = time.perf_counter() - start
+
+        info = client._request("GET", "/health")
+        print(f"\n✅ {len(queries)} concurrent queries in {elapsed:.2f}s")
+        print(f"   Embedding batches: {info['batches']} for {info['queries']} queries")
+        print(f"   First result: {results[0][0]['source'] if results[0] else 'none'}")
+
+        client.close()
+        server.shutdown()
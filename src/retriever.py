@@ -1,32 +1,235 @@
+import os
+import threading
 import numpy as np
-from typing import List, Dict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Dict, Tuple
 from embedder import Embedder
 from vector_store_builder import VectorStore
+from sharded_vector_store import ShardedVectorStore, SHARD_MANIFEST
+from concurrency import ReadWriteLock
+from mmr import mmr_select
+from profiling import build_stage
+from snapshots import (
+    SNAPSHOT_DIR, current_version, resolve_store_dir, verify_snapshot, publish_snapshot,
+    pin_snapshot, unpin_snapshot
+)
+from log_config import get_logger
+import metrics
+
+logger = get_logger("retriever")
+
+# Default score_threshold per metric
+DEFAULT_THRESHOLDS = {
+    "l2": 1.5,      # max distance
+    "cosine": 0.3   # min similarity
+}
+
+class StoreHandle:
+    """
+    One loaded store version plus the embedder that matches it.
+    
+    Requests hold a reference for their whole embed + search, so an
+    index swap never mixes two versions within one request. A retired
+    handle releases its store once the last request lets go; until then
+    its snapshot folder is pinned so pruning keeps it (shards load lazily).
+    """
+    
+    def __init__(self, store, embedder: Embedder, version: str = None, snapshot_dir: Path = None):
+        self.store = store
+        self.embedder = embedder
+        self.version = version
+        self.snapshot_dir = snapshot_dir
+        if snapshot_dir is not None:
+            pin_snapshot(snapshot_dir)
+        self.metric = store.metric
+        self._refs = 0
+        self._retired = False
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        with self._lock:
+            self._refs += 1
+    
+    def release(self):
+        with self._lock:
+            self._refs -= 1
+            done = self._retired and self._refs == 0
+        if done:
+            self._close()
+    
+    def retire(self):
+        """Mark as replaced; closes now or when the last request releases it."""
+        with self._lock:
+            self._retired = True
+            done = self._refs == 0
+        if done:
+            self._close()
+    
+    def _close(self):
+        close = getattr(self.store, 'close', None)
+        if close is not None:
+            close()
+        self.store = None
+        if self.snapshot_dir is not None:
+            unpin_snapshot(self.snapshot_dir)
+        logger.info(f"♻️  Released index version {self.version or 'legacy'}")
+
 
 class Retriever:
     """Retrieves relevant chunks from vector store."""
     
-    def __init__(self, vector_store_path: str = "data/processed"):
+    def __init__(
+        self,
+        vector_store_path: str = "data/processed",
+        watch_interval: float = None,
+        mmr_lambda: float = None,
+        mmr_fetch: int = None
+    ):
         """
         Args:
             vector_store_path: Path to saved FAISS index
+                               (or sharded store folder, or a snapshot
+                               root with a CURRENT pointer)
+            watch_interval: Seconds between checks for a newly published
+                            snapshot (default: RAG_INDEX_WATCH_S env var,
+                            else 30; 0 = never)
+            mmr_lambda: Default MMR trade-off for diverse results, 1 =
+                        relevance only, 0 = diversity only (default:
+                        RAG_MMR_LAMBDA env var, else MMR off)
+            mmr_fetch: Candidates fetched per result for MMR
+                       (default: RAG_MMR_FETCH env var, else 4)
+        """
+        logger.info("🔧 Initializing retriever...")
+        
+        self.vector_store_path = vector_store_path
+        if mmr_lambda is None and os.getenv("RAG_MMR_LAMBDA"):
+            mmr_lambda = float(os.getenv("RAG_MMR_LAMBDA"))
+        self.mmr_lambda = mmr_lambda
+        self.mmr_fetch = mmr_fetch or int(os.getenv("RAG_MMR_FETCH", "4"))
+        # Requests pin the live handle under read, swaps take write
+        self._swap_lock = ReadWriteLock()
+        self._handle = self._open(current_version(vector_store_path))
+        
+        # Watch for new snapshots in the background
+        if watch_interval is None:
+            watch_interval = float(os.getenv("RAG_INDEX_WATCH_S", "30"))
+        self._stop = threading.Event()
+        if watch_interval > 0:
+            threading.Thread(
+                target=self._watch, args=(watch_interval,), name="index-watcher", daemon=True
+            ).start()
+        
+        logger.info("✅ Retriever ready")
+    
+    def _open(self, version: str, embedder: Embedder = None) -> StoreHandle:
+        """Load one store version (never on the request path after startup)."""
+        directory = Path(self.vector_store_path)
+        if version is not None:
+            directory = directory / SNAPSHOT_DIR / version
+            verify_snapshot(directory)
+        
+        # Load vector store (shards load lazily on first query)
+        if (directory / SHARD_MANIFEST).exists():
+            store = ShardedVectorStore(str(directory))
+        else:
+            store = VectorStore()
+            store.load(str(directory))
+        
+        # Load embedder (normalized vectors for cosine stores); reuse the
+        # current one unless the new version changed metric
+        if embedder is None or embedder.normalize != (store.metric == "cosine"):
+            embedder = Embedder(normalize=(store.metric == "cosine"))
+        
+        return StoreHandle(store, embedder, version, directory if version is not None else None)
+    
+    def reload(self) -> bool:
         """
-        print("🔧 Initializing retriever...")
+        Swap in the current snapshot if it changed.
+        The new version is fully loaded before the swap; requests in
+        flight finish on the old one.
         
-        # Load embedder
-        self.embedder = Embedder()
+        Returns:
+            True if a new version was swapped in
+        """
+        version = current_version(self.vector_store_path)
+        if version is None or version == self._handle.version:
+            return False
         
-        # Load vector store
-        self.vector_store = VectorStore()
-        self.vector_store.load(vector_store_path)
+        logger.info(f"🔄 Loading index version {version}...")
+        handle = self._open(version, embedder=self._handle.embedder)
+        if isinstance(handle.store, ShardedVectorStore):
+            handle.store.load_all()
         
-        print("✅ Retriever ready")
+        with self._swap_lock.write():
+            old, self._handle = self._handle, handle
+        old.retire()
+        
+        logger.info(f"✅ Index version {version} is live")
+        return True
+    
+    def _watch(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.reload()
+            except Exception as e:
+                # Keep serving the current version
+                logger.error("❌ Index reload failed: %s", e)
+    
+    def close(self):
+        """Stop the snapshot watcher."""
+        self._stop.set()
+    
+    @contextmanager
+    def _acquire(self):
+        """Current store handle, pinned for the duration of a request."""
+        with self._swap_lock.read():
+            handle = self._handle
+            handle.acquire()
+        try:
+            yield handle
+        finally:
+            handle.release()
+    
+    def pinned(self):
+        """
+        Context manager yielding the current StoreHandle, pinned until
+        the block exits: embed with its embedder and pass it to
+        search_embeddings(handle=...) to stay on one version.
+        """
+        return self._acquire()
+    
+    @property
+    def vector_store(self):
+        return self._handle.store
+    
+    @property
+    def embedder(self) -> Embedder:
+        return self._handle.embedder
+    
+    @property
+    def metric(self) -> str:
+        return self._handle.metric
+    
+    @property
+    def version(self) -> str:
+        """Live snapshot version (None for a legacy flat store)."""
+        return self._handle.version
+    
+    def list_subjects(self) -> List[str]:
+        """Subjects that can be passed to retrieve()."""
+        with self._acquire() as handle:
+            return handle.store.list_subjects()
     
     def retrieve(
         self, 
         query: str, 
         top_k: int = 3,
-        score_threshold: float = 1.5
+        score_threshold: float = None,
+        subject: str = None,
+        sources: List[str] = None,
+        page_range: Tuple[int, int] = None,
+        mmr_lambda: float = None
     ) -> List[Dict]:
         """
         Retrieve relevant documents for a query.
@@ -34,59 +237,219 @@ class Retriever:
         Args:
             query: User question
             top_k: Number of results to return
-            score_threshold: Max distance (lower = more similar)
-                            1.5 is good default for filtering
+            score_threshold: Cosine store - min similarity in [0, 1]
+                            (higher = stricter, default 0.3)
+                            L2 store - max distance
+                            (lower = stricter, default 1.5)
+            subject: Only search this subject
+            sources: Only search these PDFs
+            page_range: Only search pages (first, last), inclusive
+            mmr_lambda: Pick a diverse top_k out of more candidates
+                        with maximal marginal relevance (default: the
+                        retriever's mmr_lambda; 1 = plain top-k)
         
         Returns:
             List of relevant documents with scores
         """
-        print(f"\n🔍 Searching for: '{query}'")
+        logger.debug("🔍 Searching for: '%s'", query)
         
-        # Convert query to embedding
-        query_embedding = self.embedder.embed_query(query)
+        with self._acquire() as handle:
+            # Convert query to embedding
+            with metrics.span("embed"):
+                query_embedding = handle.embedder.embed_query(query)
+            
+            results = self._search(
+                handle, query_embedding[None, :], top_k, score_threshold, mmr_lambda,
+                subject=subject, sources=sources, page_range=page_range
+            )[0]
         
-        # Search vector store
-        results = self.vector_store.search(query_embedding, k=top_k)
+        logger.debug("✅ Found %d relevant results", len(results))
         
-        # Filter by threshold
-        filtered = [r for r in results if r['score'] < score_threshold]
+        return results
+    
+    def retrieve_batch(
+        self,
+        queries: List[str],
+        top_k: int = 3,
+        score_threshold: float = None,
+        mmr_lambda: float = None,
+        **filters
+    ) -> List[List[Dict]]:
+        """
+        Retrieve for many queries with one embedding pass.
+        Same arguments as retrieve(); returns one result list per query.
+        """
+        logger.debug("🔍 Searching for %d queries", len(queries))
+        with self._acquire() as handle:
+            with metrics.span("embed"):
+                query_embeddings = handle.embedder.embed_queries(queries)
+            return self._search(handle, query_embeddings, top_k, score_threshold, mmr_lambda, **filters)
+    
+    def search_embeddings(
+        self,
+        query_embeddings: np.ndarray,
+        top_k: int = 3,
+        score_threshold: float = None,
+        mmr_lambda: float = None,
+        handle: StoreHandle = None,
+        **filters
+    ) -> List[List[Dict]]:
+        """
+        Search already-embedded queries and apply the threshold.
         
-        print(f"✅ Found {len(filtered)} relevant results (from {len(results)} total)")
+        Args:
+            query_embeddings: One query vector per row
+            top_k: Number of results per query
+            score_threshold: See retrieve()
+            mmr_lambda: See retrieve()
+            handle: Search this pinned version (see pinned()), e.g. the
+                    one whose embedder embedded the queries
+            **filters: subject / sources / page_range
         
-        return filtered
-
+        Returns:
+            One filtered result list per query
+        """
+        if handle is not None:
+            return self._search(handle, query_embeddings, top_k, score_threshold, mmr_lambda, **filters)
+        with self._acquire() as handle:
+            return self._search(handle, query_embeddings, top_k, score_threshold, mmr_lambda, **filters)
+    
+    def candidates(
+        self,
+        query_embedding: np.ndarray,
+        k: int,
+        score_threshold: float = None,
+        **filters
+    ) -> Tuple[List[Dict], np.ndarray, str]:
+        """
+        Plain top-k search plus the stored vectors of the results, so a
+        caller can re-rank them later without searching the index.
+        
+        Returns:
+            (results, vectors one row per result, store version)
+        """
+        with self._acquire() as handle:
+            results = self._search(
+                handle, query_embedding[None, :], k, score_threshold, mmr_lambda=1.0, **filters
+            )[0]
+            return results, handle.store.vectors(results), handle.version
+    
+    def _search(
+        self,
+        handle: StoreHandle,
+        query_embeddings: np.ndarray,
+        top_k: int,
+        score_threshold: float,
+        mmr_lambda: float = None,
+        **filters
+    ) -> List[List[Dict]]:
+        """search_embeddings() against a pinned store version."""
+        if score_threshold is None:
+            score_threshold = DEFAULT_THRESHOLDS[handle.metric]
+        if mmr_lambda is None:
+            mmr_lambda = self.mmr_lambda
+        diversify = mmr_lambda is not None and mmr_lambda < 1
+        
+        # Over-fetch candidates for MMR to choose from
+        k = top_k * self.mmr_fetch if diversify else top_k
+        
+        if handle.metric == "cosine":
+            # Threshold applied inside the index search
+            with metrics.span("search"):
+                batches = handle.store.search_batch(
+                    query_embeddings, k=k, min_score=score_threshold, **filters
+                )
+        else:
+            # Search vector store, then filter by max distance
+            with metrics.span("search"):
+                batches = handle.store.search_batch(query_embeddings, k=k, **filters)
+            with metrics.span("threshold_filter"):
+                batches = [[r for r in results if r['score'] < score_threshold] for results in batches]
+        
+        if not diversify:
+            return batches
+        
+        with metrics.span("mmr"):
+            return [
+                self._diversify(handle, query, results, top_k, mmr_lambda)
+                for query, results in zip(query_embeddings, batches)
+            ]
+    
+    @staticmethod
+    def _diversify(
+        handle: StoreHandle,
+        query_embedding: np.ndarray,
+        candidates: List[Dict],
+        top_k: int,
+        mmr_lambda: float
+    ) -> List[Dict]:
+        """MMR top_k of the candidates, vectors read back from the index."""
+        if len(candidates) <= 1:
+            return candidates[:top_k]
+        
+        vectors = handle.store.vectors(candidates)
+        return [candidates[i] for i in mmr_select(query_embedding, vectors, top_k, mmr_lambda)]
 
 # BUILD VECTOR STORE FIRST (run once)
-def build_index():
-    """Build vector store from PDFs."""
-    print("🏗️  BUILDING VECTOR STORE\n")
+def build_index(metric: str = "cosine", shard_by: str = None, dedup: bool = True, profile: bool = None):
+    """
+    Build vector store from PDFs.
+    
+    Args:
+        metric: "cosine" (normalized vectors, inner product) or "l2"
+        shard_by: None for a single store in data/processed, or
+                  "subject"/"hash" for a sharded store in
+                  data/processed/shards
+        dedup: Collapse near-duplicate chunks before embedding
+               (survivors keep every location in 'provenance')
+        profile: Write a cProfile + tracemalloc report per stage
+                 (default: RAG_PROFILE_BUILD env var, see profiling)
+    """
+    logger.info("🏗️  BUILDING VECTOR STORE")
     
     from pdf_loader import PDFLoader
     from text_splitter import TextSplitter
     
     # Load PDFs
-    loader = PDFLoader()
-    docs = loader.load_pdfs()
+    with build_stage("extract", profile):
+        with PDFLoader() as loader:
+            docs = loader.load_pdfs()
     
     if not docs:
-        print("❌ No documents to index")
+        logger.error("❌ No documents to index")
         return
     
     # Chunk texts
-    splitter = TextSplitter()
-    chunks = splitter.split_documents(docs)
+    with build_stage("split", profile):
+        splitter = TextSplitter()
+        chunks = splitter.split_documents(docs)
+    
+    if dedup:
+        from dedup import deduplicate_chunks
+        with build_stage("dedup", profile):
+            chunks = deduplicate_chunks(chunks)
     
     # Generate embeddings
-    embedder = Embedder()
-    texts = [c['text'] for c in chunks]
-    embeddings = embedder.embed_documents(texts)
+    with build_stage("embed", profile):
+        embedder = Embedder(normalize=(metric == "cosine"))
+        texts = [c['text'] for c in chunks]
+        embeddings = embedder.embed_documents(texts)
     
-    # Build vector store
-    store = VectorStore()
-    store.add_documents(embeddings, chunks)
-    store.save()
+    # Build vector store as a new snapshot; running retrievers pick it up
+    with build_stage("index", profile):
+        if shard_by:
+            publish_snapshot(
+                "data/processed/shards",
+                lambda directory: ShardedVectorStore(directory).build(
+                    embeddings, chunks, partition=shard_by, metric=metric
+                )
+            )
+        else:
+            store = VectorStore(metric=metric)
+            store.add_documents(embeddings, chunks)
+            publish_snapshot("data/processed", store.save)
     
-    print("\n✅ Vector store built and saved!")
+    logger.info("✅ Vector store built and saved!")
 
 
 # TEST
@@ -94,15 +457,14 @@ if __name__ == "__main__":
     import sys
     
     if len(sys.argv) > 1 and sys.argv[1] == "build":
-        # Build index
-        build_index()
+        # Build index (optional: build subject|hash for a sharded store)
+        build_index(shard_by=sys.argv[2] if len(sys.argv) > 2 else None)
     else:
         # Test retrieval
         print("🧪 TESTING RETRIEVER\n")
         
         # Check if index exists
-        from pathlib import Path
-        if not Path("data/processed/faiss.index").exists():
+        if not (resolve_store_dir("data/processed") / "faiss.index").exists():
             print("⚠️  Vector store not found!")
             print("   Run: python src/retriever.py build")
             sys.exit(1)
@@ -0,0 +1,168 @@
+import os
+import re
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from metadata_index import chunk_key
+from mmr import mmr_select
+
+# Short questions that lean on the previous turn. Only explicit
+# references count: ordinals, "point" or "example" inside a normal
+# question ("explain first come first serve", "what is a floating point
+# number") start a new topic.
+_REFERENCE_WORDS = re.compile(
+    r"\b(it|its|this|that|these|those|they|them|above|same|again|elaborate)\b",
+    re.IGNORECASE
+)
+_FOLLOW_UP_PHRASES = re.compile(
+    r"^(?:(?:give|show|provide|write)\s+(?:me\s+)?)?(?:an?|another|more|some)\s+examples?\b"
+    r"|\b(?:the|that)\s+(?:first|second|third|fourth|fifth|last|previous)\s+(?:point|part|step|one)\b"
+    r"|\b(?:explain|tell me)\s+more\b",
+    re.IGNORECASE
+)
+FOLLOW_UP_MAX_WORDS = 8
+
+
+def is_follow_up(query: str) -> bool:
+    """True for short questions that explicitly refer back to the previous turn."""
+    query = query.strip()
+    if len(query.split()) > FOLLOW_UP_MAX_WORDS:
+        return False
+    return bool(_FOLLOW_UP_PHRASES.search(query) or _REFERENCE_WORDS.search(query))
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    vector = np.asarray(vector, dtype='float32')
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+
+class Session:
+    """
+    Conversation state of one user: the topic query, its embedding and
+    the candidate chunks (with their vectors) retrieved for it.
+    """
+
+    __slots__ = ('query', 'embedding', 'subject', 'version', 'candidates', 'vectors', 'turns', 'last_used')
+
+    def __init__(self, query: str, embedding: np.ndarray, subject: Optional[str], version: Optional[str]):
+        self.query = query
+        self.embedding = _unit(embedding)
+        self.subject = subject
+        self.version = version
+        self.candidates: List[Dict] = []
+        self.vectors = np.zeros((0, len(self.embedding)), dtype='float32')
+        self.turns = 1
+        self.last_used = time.monotonic()
+
+    def follow(self, query_embedding: np.ndarray, weight: float = 0.5) -> np.ndarray:
+        """
+        Move the topic embedding towards a follow-up question; a vague
+        follow-up alone would retrieve poorly.
+        """
+        self.embedding = _unit(weight * self.embedding + (1 - weight) * _unit(query_embedding))
+        self.turns += 1
+        return self.embedding
+
+    def extend(self, results: List[Dict], vectors: np.ndarray, limit: int):
+        """
+        Add newly retrieved chunks to the candidate set (by chunk key),
+        keeping the `limit` closest to the current topic embedding.
+        """
+        known = {chunk_key(c) for c in self.candidates}
+        new = [i for i, r in enumerate(results) if chunk_key(r) not in known]
+        if new:
+            self.candidates = self.candidates + [dict(results[i]) for i in new]
+            self.vectors = np.vstack([self.vectors, np.asarray(vectors, dtype='float32')[new]])
+
+        if len(self.candidates) > limit:
+            keep = np.argsort(-(self.vectors @ self.embedding), kind='stable')[:limit]
+            self.candidates = [self.candidates[i] for i in keep]
+            self.vectors = self.vectors[keep]
+
+    def rank(self, k: int, min_score: float, mmr_lambda: float = None, mmr_fetch: int = 4) -> List[Dict]:
+        """
+        Top-k cached candidates for the current topic embedding, scored
+        by cosine similarity (the index is not searched).
+
+        With mmr_lambda < 1 the k are picked by MMR out of the best
+        k x mmr_fetch, like Retriever.retrieve() does.
+        """
+        if not self.candidates:
+            return []
+
+        scores = self.vectors @ self.embedding
+        order = [i for i in np.argsort(-scores, kind='stable') if scores[i] >= min_score]
+        if mmr_lambda is not None and mmr_lambda < 1 and len(order) > 1:
+            pool = order[:k * mmr_fetch]
+            order = [pool[j] for j in mmr_select(self.embedding, self.vectors[pool], k, mmr_lambda)]
+
+        results = []
+        for i in order[:k]:
+            chunk = dict(self.candidates[i])
+            chunk['score'] = float(scores[i])
+            results.append(chunk)
+        return results
+
+
+class SessionStore:
+    """
+    Sessions by id, bounded in count and evicted when idle.
+
+    Each session holds one embedding and at most `max_candidates`
+    chunks and vectors, so memory is bounded by
+    max_sessions x max_candidates chunks.
+    """
+
+    def __init__(self, max_sessions: int = None, idle_seconds: float = None, max_candidates: int = None):
+        """
+        Args:
+            max_sessions: Least recently used sessions beyond this are
+                          dropped (default: RAG_SESSION_MAX env var, else 1000)
+            idle_seconds: Sessions unused this long are dropped
+                          (default: RAG_SESSION_IDLE_S env var, else 1800)
+            max_candidates: Cached chunks per session
+                            (default: RAG_SESSION_CANDIDATES env var, else 24)
+        """
+        self.max_sessions = max_sessions or int(os.getenv("RAG_SESSION_MAX", "1000"))
+        self.idle_seconds = idle_seconds or float(os.getenv("RAG_SESSION_IDLE_S", "1800"))
+        self.max_candidates = max_candidates or int(os.getenv("RAG_SESSION_CANDIDATES", "24"))
+
+        # Least recently used first
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """Live session (marked as used), or None if unknown or evicted."""
+        with self._lock:
+            self._evict_idle()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_used = time.monotonic()
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def put(self, session_id: str, session: Session):
+        """Start (or replace) a session."""
+        with self._lock:
+            self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            self._evict_idle()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def drop(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.idle_seconds
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_used >= cutoff:
+                break
+            self._sessions.popitem(last=False)
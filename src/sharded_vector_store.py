@@ -0,0 +1,363 @@
+import hashlib
+import heapq
+import json
+import os
+import shutil
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Tuple
+from metadata_index import subject_of, SHARD_MANIFEST
+from vector_store_builder import VectorStore
+from snapshots import SNAPSHOT_DIR, publish_snapshot
+from log_config import get_logger
+
+logger = get_logger("sharded_vector_store")
+
+# How chunks are assigned to shards
+PARTITIONS = ("subject", "hash")
+
+
+class ShardedVectorStore:
+    """
+    Vector store split into independent on-disk shards.
+
+    Each shard is a plain VectorStore in its own folder. Queries fan out
+    to the shards in parallel (FAISS releases the GIL) and the per-shard
+    results are merged into one top-k. Shards load on first query and
+    can be rebuilt one at a time (into a new snapshot, see rebuild_shard()).
+    """
+
+    def __init__(self, directory: str = "data/processed/shards", max_workers: int = None):
+        """
+        Args:
+            directory: Folder holding shards.json and one folder per shard
+            max_workers: Search threads (default: one per shard, max 32)
+        """
+        self.directory = Path(directory)
+        self.max_workers = max_workers
+        self.partition = "subject"
+        self.num_shards = 0
+        self.metric = "cosine"
+        self.dimension = 384
+
+        # shard name -> {'subjects': [...], 'sources': [...], 'count': int}
+        self.shards = {}
+        self._loaded = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+        if (self.directory / SHARD_MANIFEST).exists():
+            self._read_manifest()
+
+    # ---------- building ----------
+
+    def build(
+        self,
+        embeddings: np.ndarray,
+        documents: List[Dict],
+        partition: str = "subject",
+        num_shards: int = 8,
+        metric: str = "cosine"
+    ):
+        """
+        Partition documents into shards and save them all.
+
+        Args:
+            embeddings: Document embeddings
+            documents: Document metadata
+            partition: "subject" (one shard per subject) or
+                       "hash" (num_shards buckets by source PDF)
+            num_shards: Bucket count for hash partitioning
+            metric: "cosine" or "l2"
+        """
+        if partition not in PARTITIONS:
+            raise ValueError(f"❌ Unknown partition '{partition}'. Use one of {PARTITIONS}")
+
+        self.partition = partition
+        self.num_shards = num_shards
+        self.metric = metric
+        self.dimension = embeddings.shape[1]
+
+        groups = {}
+        for idx, doc in enumerate(documents):
+            groups.setdefault(self.shard_for(doc), []).append(idx)
+
+        logger.info(f"🧩 Building {len(groups)} shard(s) by {partition}...")
+
+        self.shards = {}
+        for name, rows in sorted(groups.items()):
+            self._write_shard(name, embeddings[rows], [documents[i] for i in rows])
+
+        logger.info(f"✅ Sharded store saved to {self.directory}/")
+
+    def shard_for(self, doc: Dict) -> str:
+        """Shard name for a chunk."""
+        if self.partition == "subject":
+            return subject_of(doc)
+        digest = hashlib.md5(doc['source'].encode('utf-8')).digest()
+        bucket = int.from_bytes(digest[:8], 'little') % self.num_shards
+        return f"shard_{bucket:03d}"
+
+    def rebuild_shard(self, name: str, embeddings: np.ndarray, documents: List[Dict], keep: int = 3) -> str:
+        """
+        Publish a new snapshot with one shard rebuilt.
+
+        This store's folder is never written (retrievers may be reading
+        it, and its MANIFEST checksums must keep matching): the other
+        shards are hard-linked (or copied) into the new snapshot. Running
+        retrievers pick it up like any other published version.
+
+        Args:
+            name: Shard name (see shard_for())
+            embeddings: Embeddings of every chunk in this shard
+            documents: Metadata of every chunk in this shard
+            keep: Snapshots to keep (see snapshots.publish_snapshot)
+
+        Returns:
+            The new snapshot version
+        """
+        # Snapshot root of this version, or this folder for a store
+        # saved before snapshots existed
+        if self.directory.parent.name == SNAPSHOT_DIR:
+            root = self.directory.parent.parent
+        else:
+            root = self.directory
+
+        def write(directory: str):
+            staged = ShardedVectorStore(directory, max_workers=self.max_workers)
+            staged.partition = self.partition
+            staged.num_shards = self.num_shards
+            staged.metric = self.metric
+            staged.dimension = self.dimension
+            staged.shards = {k: v for k, v in self.shards.items() if k != name}
+            for other in staged.shards:
+                shutil.copytree(self.directory / other, Path(directory) / other, copy_function=_link_or_copy)
+            staged._write_shard(name, embeddings, documents)
+
+        version = publish_snapshot(str(root), write, keep=keep)
+        logger.info(f"✅ Shard {name} rebuilt in snapshot {version}")
+        return version
+
+    def _write_shard(self, name: str, embeddings: np.ndarray, documents: List[Dict]):
+        """Save one shard into this (not yet published) store folder."""
+        store = VectorStore(dimension=self.dimension, metric=self.metric)
+        store.add_documents(embeddings, documents)
+        store.save(str(self.directory / name))
+
+        with self._lock:
+            if name not in self.shards and self._executor is not None:
+                # Pool is sized by shard count
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+            self.shards[name] = {
+                'subjects': store.list_subjects(),
+                'sources': store.list_sources(),
+                'count': len(documents)
+            }
+            self._loaded.pop(name, None)
+            self._write_manifest()
+
+    def _write_manifest(self):
+        """Save partition settings and per-shard metadata."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        manifest = {
+            'partition': self.partition,
+            'num_shards': self.num_shards,
+            'metric': self.metric,
+            'dimension': self.dimension,
+            'shards': self.shards
+        }
+        with open(self.directory / SHARD_MANIFEST, 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+    def _read_manifest(self):
+        """Load partition settings and per-shard metadata."""
+        with open(self.directory / SHARD_MANIFEST) as f:
+            manifest = json.load(f)
+
+        self.partition = manifest['partition']
+        self.num_shards = manifest['num_shards']
+        self.metric = manifest['metric']
+        self.dimension = manifest['dimension']
+        self.shards = manifest['shards']
+
+        total = sum(s['count'] for s in self.shards.values())
+        logger.info(f"📂 Found {len(self.shards)} shard(s) with {total} documents in {self.directory}/")
+
+    # ---------- searching ----------
+
+    def _shard(self, name: str) -> VectorStore:
+        """Load a shard on first use."""
+        store = self._loaded.get(name)
+        if store is not None:
+            return store
+
+        with self._lock:
+            if name not in self._loaded:
+                store = VectorStore()
+                store.load(str(self.directory / name))
+                self._loaded[name] = store
+            return self._loaded[name]
+
+    def load_all(self):
+        """Load every shard now (e.g. before swapping this store in)."""
+        for name in self.shards:
+            self._shard(name)
+
+    def close(self):
+        """Stop the search pool (the store can still load, it restarts)."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def _pool(self) -> ThreadPoolExecutor:
+        """Thread pool shared by all queries."""
+        with self._lock:
+            if self._executor is None:
+                workers = self.max_workers or min(32, max(1, len(self.shards)))
+                self._executor = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix="shard-search"
+                )
+            return self._executor
+
+    def _matching_shards(self, subject: str = None, sources: List[str] = None) -> List[str]:
+        """Skip shards that cannot contain matching chunks."""
+        names = []
+        for name, info in self.shards.items():
+            if subject is not None and subject not in info['subjects']:
+                continue
+            if sources is not None and not set(sources) & set(info['sources']):
+                continue
+            names.append(name)
+        return names
+
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        k: int = 3,
+        min_score: float = None,
+        subject: str = None,
+        sources: List[str] = None,
+        page_range: Tuple[int, int] = None
+    ) -> List[Dict]:
+        """
+        Search all matching shards in parallel and merge the top-k.
+        Same arguments and result format as VectorStore.search();
+        each result also carries its 'shard' name.
+        """
+        names = self._matching_shards(subject, sources)
+        if not names:
+            return []
+
+        def search_shard(name: str) -> List[Dict]:
+            results = self._shard(name).search(
+                query_embedding, k=k, min_score=min_score,
+                subject=subject, sources=sources, page_range=page_range
+            )
+            for r in results:
+                r['shard'] = name
+            return results
+
+        if len(names) == 1:
+            candidates = search_shard(names[0])
+        else:
+            candidates = [r for results in self._pool().map(search_shard, names) for r in results]
+
+        # Heap-based top-k merge
+        if self.metric == "cosine":
+            return heapq.nlargest(k, candidates, key=lambda r: r['score'])
+        return heapq.nsmallest(k, candidates, key=lambda r: r['score'])
+
+    def search_batch(
+        self,
+        query_embeddings: np.ndarray,
+        k: int = 3,
+        min_score: float = None,
+        **filters
+    ) -> List[List[Dict]]:
+        """Search many queries (each one fans out over the shards)."""
+        return [self.search(q, k=k, min_score=min_score, **filters) for q in query_embeddings]
+
+    def vectors(self, results: List[Dict]) -> np.ndarray:
+        """Stored vectors of search results (by 'shard' and 'id'), one row each."""
+        rows = np.zeros((len(results), self.dimension), dtype='float32')
+        by_shard = {}
+        for i, r in enumerate(results):
+            by_shard.setdefault(r['shard'], []).append(i)
+        for name, positions in by_shard.items():
+            rows[positions] = self._shard(name).vectors([results[i] for i in positions])
+        return rows
+
+    def list_subjects(self) -> List[str]:
+        """Subjects available for filtered search."""
+        return sorted({s for info in self.shards.values() for s in info['subjects']})
+
+    def list_sources(self) -> List[str]:
+        """Source PDFs available for filtered search."""
+        return sorted({s for info in self.shards.values() for s in info['sources']})
+
+    @property
+    def documents(self) -> List[Dict]:
+        """All loaded documents (loads every shard)."""
+        return [doc for name in self.shards for doc in self._shard(name).documents]
+
+
+def _link_or_copy(src: str, dst: str):
+    """Hard-link a snapshot file (never modified in place), else copy it."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+# TEST
+if __name__ == "__main__":
+    import tempfile
+
+    print("🧪 TESTING SHARDED VECTOR STORE\n")
+
+    rng = np.random.default_rng(0)
+
+    # Synthetic chunks from two subjects
+    docs = [
+        {'text': f"{subject} chunk {i}", 'source': f"{subject}.pdf",
+         'page': i + 1, 'chunk_id': 1, 'subject': subject}
+        for subject in ("data_structure", "operating_system")
+        for i in range(50)
+    ]
+    embeddings = rng.normal(size=(len(docs), 384)).astype('float32')
+
+    # Throwaway folder, nothing is written into data/
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ShardedVectorStore(tmp)
+        store.build(embeddings, docs, partition="subject")
+
+        reloaded = ShardedVectorStore(tmp)
+        query = embeddings[7]
+
+        print("\n🔍 All shards:")
+        for r in reloaded.search(query, k=3):
+            print(f"   Score: {r['score']:.3f} | {r['shard']} | {r['text']}")
+
+        print("\n🔍 Only operating_system:")
+        for r in reloaded.search(query, k=3, subject="operating_system"):
+            print(f"   Score: {r['score']:.3f} | {r['shard']} | {r['text']}")
+
+        # Rebuilding a shard publishes a new snapshot, the old one is untouched
+        from snapshots import resolve_store_dir, verify_snapshot
+        first = resolve_store_dir(tmp)
+        rows = [i for i, d in enumerate(docs) if d['subject'] == "operating_system"][:10]
+        reloaded.rebuild_shard("operating_system", embeddings[rows], [docs[i] for i in rows])
+        second = resolve_store_dir(tmp)
+        assert second != first and (Path(tmp) / SHARD_MANIFEST).exists()
+        verify_snapshot(second)
+        rebuilt = ShardedVectorStore(str(second))
+        assert rebuilt.shards['operating_system']['count'] == 10
+        assert rebuilt.shards['data_structure']['count'] == 50
+        print(f"\n🔁 Rebuilt operating_system into snapshot {second.name}")
+
+    print(f"\n✅ Test passed!")
@@ -0,0 +1,231 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, Optional
+from log_config import get_logger
+
+logger = get_logger("snapshots")
+
+# Layout under a store root (e.g. data/processed):
+#   snapshots/<version>/...       one complete store per build
+#   snapshots/<version>/MANIFEST  file list with sha256 checksums
+#   CURRENT                       name of the live version
+SNAPSHOT_DIR = "snapshots"
+POINTER_FILE = "CURRENT"
+MANIFEST_FILE = "MANIFEST.json"
+
+# Snapshot folders still read by store handles in this process (lazily
+# loaded shards): folder -> open handles. prune_snapshots() skips them and
+# they are deleted when their last handle is released.
+_pins: Dict[str, int] = {}
+_prune_pending = set()
+_pins_lock = threading.Lock()
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_atomic(path: Path, text: str):
+    """Write a small file so readers see the old or new content, never a mix."""
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    with open(tmp, 'w') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def current_version(root: str) -> Optional[str]:
+    """Live snapshot version under root, or None (legacy flat store)."""
+    pointer = Path(root) / POINTER_FILE
+    try:
+        return pointer.read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def resolve_store_dir(root: str) -> Path:
+    """
+    Folder holding the live store files.
+
+    The current snapshot if root has a CURRENT pointer, else root itself
+    (stores saved before snapshots existed).
+    """
+    version = current_version(root)
+    if version is None:
+        return Path(root)
+    return Path(root) / SNAPSHOT_DIR / version
+
+
+def read_manifest(snapshot_dir: Path) -> Dict:
+    with open(Path(snapshot_dir) / MANIFEST_FILE) as f:
+        return json.load(f)
+
+
+def verify_snapshot(snapshot_dir: Path):
+    """
+    Check every file against the manifest checksums.
+
+    Raises:
+        ValueError: On a missing or corrupted file
+    """
+    snapshot_dir = Path(snapshot_dir)
+    manifest = read_manifest(snapshot_dir)
+
+    for name, expected in manifest['files'].items():
+        path = snapshot_dir / name
+        if not path.exists():
+            raise ValueError(f"❌ Snapshot {manifest['version']} is missing {name}")
+        if _sha256(path) != expected:
+            raise ValueError(f"❌ Snapshot {manifest['version']}: checksum mismatch for {name}")
+
+
+def _new_version() -> str:
+    """
+    Snapshot name that sorts by creation time, also within one second
+    (prune_snapshots() keeps the last names): local time, nanoseconds,
+    and a random suffix against two publishers at the same instant.
+    """
+    now = time.time_ns()
+    stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(now // 10**9))
+    return f"{stamp}-{now % 10**9:09d}-{uuid.uuid4().hex[:6]}"
+
+
+def publish_snapshot(root: str, write: Callable[[str], None], keep: int = 3) -> str:
+    """
+    Write a new store version and make it live atomically.
+
+    The store is written into a temp folder, checksummed, renamed into
+    snapshots/<version>, and only then is CURRENT switched to it. A
+    crash at any point leaves the previous version live.
+
+    Args:
+        root: Store root (e.g. "data/processed")
+        write: Called with a folder path; must write the store files
+               (e.g. VectorStore.save or ShardedVectorStore(...).build)
+        keep: Snapshots to keep, including the new one (older ones are
+              deleted once no store handle in this process pins them)
+
+    Returns:
+        The new version name
+    """
+    snapshots = Path(root) / SNAPSHOT_DIR
+    snapshots.mkdir(parents=True, exist_ok=True)
+
+    version = _new_version()
+    staging = snapshots / f".staging-{version}"
+    staging.mkdir()
+
+    try:
+        write(str(staging))
+
+        files = {
+            str(path.relative_to(staging)): _sha256(path)
+            for path in sorted(staging.rglob("*")) if path.is_file()
+        }
+        with open(staging / MANIFEST_FILE, 'w') as f:
+            json.dump({'version': version, 'created': time.time(), 'files': files}, f, indent=2)
+
+        os.replace(staging, snapshots / version)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    _write_atomic(Path(root) / POINTER_FILE, version + "\n")
+    logger.info(f"📌 Snapshot {version} is live ({len(files)} files)")
+
+    prune_snapshots(root, keep)
+    return version
+
+
+def pin_snapshot(snapshot_dir: Path):
+    """Mark a snapshot folder as in use (see unpin_snapshot)."""
+    key = str(Path(snapshot_dir).resolve())
+    with _pins_lock:
+        _pins[key] = _pins.get(key, 0) + 1
+
+
+def unpin_snapshot(snapshot_dir: Path):
+    """Release a pin; deletes the folder if it was pruned while pinned."""
+    key = str(Path(snapshot_dir).resolve())
+    with _pins_lock:
+        count = _pins.get(key, 0) - 1
+        if count > 0:
+            _pins[key] = count
+            return
+        _pins.pop(key, None)
+        if key not in _prune_pending:
+            return
+        _prune_pending.discard(key)
+
+    shutil.rmtree(key, ignore_errors=True)
+    logger.info(f"🗑️  Removed old snapshot {Path(key).name}")
+
+
+def prune_snapshots(root: str, keep: int = 3):
+    """
+    Delete all but the newest `keep` snapshots (never the live one).
+
+    Snapshots pinned by a store handle in this process are deleted later,
+    when the handle is released.
+    """
+    snapshots = Path(root) / SNAPSHOT_DIR
+    live = current_version(root)
+
+    versions = sorted(p for p in snapshots.iterdir() if p.is_dir() and not p.name.startswith("."))
+    for old in versions[:-keep] if keep > 0 else versions:
+        if old.name == live:
+            continue
+        key = str(old.resolve())
+        with _pins_lock:
+            pinned = key in _pins
+            if pinned:
+                _prune_pending.add(key)
+        if pinned:
+            logger.info(f"⏳ Keeping old snapshot {old.name} until its readers finish")
+            continue
+        shutil.rmtree(old, ignore_errors=True)
+        logger.info(f"🗑️  Removed old snapshot {old.name}")
+
+
+# TEST
+if __name__ == "__main__":
+    import sys
+    import tempfile
+
+    print("🧪 TESTING SNAPSHOTS\n")
+
+    root = sys.argv[1] if len(sys.argv) > 1 else tempfile.mkdtemp()
+
+    def write(directory):
+        Path(directory, "data.txt").write_text(f"built at {time.time()}")
+
+    for _ in range(4):
+        publish_snapshot(root, write, keep=2)
+
+    # A pinned old snapshot survives pruning until it is unpinned
+    pinned = resolve_store_dir(root)
+    pin_snapshot(pinned)
+    for _ in range(2):
+        publish_snapshot(root, write, keep=2)
+    assert pinned.exists()
+    unpin_snapshot(pinned)
+    assert not pinned.exists()
+
+    live = resolve_store_dir(root)
+    verify_snapshot(live)
+    print(f"Live: {live}")
+    kept = sorted(p.name for p in (Path(root) / SNAPSHOT_DIR).iterdir())
+    print(f"Kept: {kept}")
+    # Published within the same second: the newest two survive
+    assert len(kept) == 2 and kept[-1] == live.name
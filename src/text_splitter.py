@@ -29,6 +29,7 @@ class TextSplitter:
         Args:
             documents: List of documents from PDFLoader
                       Each doc has: {'text': str, 'source': str, 'page': int}
+                      and optionally 'subject': str
         
         Returns:
             List of chunked documents with metadata
@@ -46,12 +47,15 @@ class TextSplitter:
             
             # Add metadata to each chunk
             for i, chunk_text in enumerate(chunks):
-                all_chunks.append({
+                chunk = {
                     'text': chunk_text,
                     'source': doc['source'],
                     'page': doc['page'],
                     'chunk_id': i + 1
-                })
+                }
+                if 'subject' in doc:
+                    chunk['subject'] = doc['subject']
+                all_chunks.append(chunk)
         
         print(f"✅ Created {len(all_chunks)} chunks from {len(documents)} pages")
         print("=" * 50)
@@ -164,8 +168,8 @@ if __name__ == "__main__":
     
     # Load documents
     print("\n📚 Step 1: Loading PDFs...")
-    loader = PDFLoader(data_dir="data/raw")
-    documents = loader.load_pdfs()
+    with PDFLoader(data_dir="data/raw") as loader:
+        documents = loader.load_pdfs()
     
     if not documents:
         print("❌ No documents to split. Add PDFs to data/raw/")
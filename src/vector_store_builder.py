@@ -1,20 +1,60 @@
 import faiss
+import json
 import numpy as np
-import pickle
+import threading
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Tuple, Optional
+from metadata_index import MetadataIndex, locations, page_bounds
+from document_store import save_documents, load_documents, remove_legacy
+from concurrency import apply_thread_budget
+from snapshots import publish_snapshot, resolve_store_dir
+from log_config import get_logger
+
+logger = get_logger("vector_store_builder")
+
+# Supported distance metrics
+METRICS = ("l2", "cosine")
 
 class VectorStore:
     """FAISS vector store for similarity search."""
     
-    def __init__(self, dimension: int = 384):
+    def __init__(self, dimension: int = 384, metric: str = "l2"):
         """
         Args:
             dimension: Embedding dimension (384 for MiniLM)
+            metric: "l2" (score = distance, lower is better) or
+                    "cosine" (score = similarity, higher is better)
         """
+        if metric not in METRICS:
+            raise ValueError(f"❌ Unknown metric '{metric}'. Use one of {METRICS}")
+        
         self.dimension = dimension
-        self.index = faiss.IndexFlatL2(dimension)
+        self.metric = metric
+        self.index = self._new_index(dimension, metric)
         self.documents = []
+        
+        # Concurrent requests each search on their own thread
+        apply_thread_budget("faiss")
+        self.metadata = MetadataIndex.from_documents([])
+        
+        # Per-source sub-indexes for filtered search (built on first use)
+        self._partitions = {}
+        self._partitions_lock = threading.Lock()
+    
+    @staticmethod
+    def _new_index(dimension: int, metric: str):
+        """Create an empty index for the metric."""
+        if metric == "cosine":
+            # Inner product on unit vectors == cosine similarity
+            return faiss.IndexFlatIP(dimension)
+        return faiss.IndexFlatL2(dimension)
+    
+    def _prepare(self, vectors: np.ndarray) -> np.ndarray:
+        """Cast to float32 and L2-normalize in cosine mode."""
+        vectors = np.array(vectors, dtype='float32', ndmin=2)
+        if self.metric == "cosine":
+            faiss.normalize_L2(vectors)
+        return vectors
     
     def add_documents(self, embeddings: np.ndarray, documents: List[Dict]):
         """
@@ -24,35 +64,223 @@ class VectorStore:
             embeddings: Document embeddings
             documents: Document metadata
         """
-        print(f"💾 Adding {len(embeddings)} documents to vector store...")
-        self.index.add(embeddings.astype('float32'))
+        logger.info(f"💾 Adding {len(embeddings)} documents to vector store...")
+        self.index.add(self._prepare(embeddings))
+        # Loaded stores hold a read-only DocumentList
+        if not isinstance(self.documents, list):
+            self.documents = list(self.documents)
         self.documents.extend(documents)
-        print(f"✅ Vector store now has {self.index.ntotal} documents")
+        self._reset_metadata()
+        logger.info(f"✅ Vector store now has {self.index.ntotal} documents")
+    
+    def _reset_metadata(self, metadata: MetadataIndex = None):
+        """Rebuild the metadata index and drop cached partitions."""
+        self.metadata = metadata or MetadataIndex.from_documents(self.documents)
+        with self._partitions_lock:
+            self._partitions = {}
     
-    def search(self, query_embedding: np.ndarray, k: int = 3) -> List[Dict]:
+    def list_subjects(self) -> List[str]:
+        """Subjects available for filtered search."""
+        return sorted(self.metadata.subjects)
+    
+    def list_sources(self) -> List[str]:
+        """Source PDFs available for filtered search."""
+        return sorted(self.metadata.ranges)
+    
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        k: int = 3,
+        min_score: float = None,
+        subject: str = None,
+        sources: List[str] = None,
+        page_range: Tuple[int, int] = None
+    ) -> List[Dict]:
         """
         Search for similar documents.
         
         Args:
             query_embedding: Query vector
             k: Number of results
+            min_score: Cosine mode only - minimum similarity.
+                       Applied inside FAISS (range search)
+            subject: Only search chunks of this subject
+            sources: Only search chunks from these PDFs
+            page_range: Only search pages (first, last), inclusive
             
         Returns:
             List of documents with scores
         """
-        distances, indices = self.index.search(
-            query_embedding.reshape(1, -1).astype('float32'), k
-        )
+        query = self._prepare(query_embedding.reshape(1, -1))
+        
+        if subject is None and sources is None and page_range is None:
+            scores, indices = self._search_index(self.index, query, k, min_score)
+        else:
+            scores, indices = self._filtered_search(
+                query, k, min_score, subject, sources, page_range
+            )
+        
+        return self._to_results(scores, indices)
+    
+    def search_batch(
+        self,
+        query_embeddings: np.ndarray,
+        k: int = 3,
+        min_score: float = None,
+        **filters
+    ) -> List[List[Dict]]:
+        """
+        Search many queries at once.
+        Unfiltered batches run as a single FAISS call.
+        
+        Args:
+            query_embeddings: Query vectors, one per row
+            k: Number of results per query
+            min_score: Cosine mode only - minimum similarity
+            **filters: subject / sources / page_range (see search())
+            
+        Returns:
+            One result list per query
+        """
+        if any(v is not None for v in filters.values()):
+            return [self.search(q, k=k, min_score=min_score, **filters) for q in query_embeddings]
         
+        queries = self._prepare(query_embeddings)
+        
+        if min_score is not None and self.metric == "cosine":
+            lims, all_scores, all_indices = self.index.range_search(queries, min_score)
+            per_query = []
+            for q in range(len(queries)):
+                scores = all_scores[lims[q]:lims[q + 1]]
+                indices = all_indices[lims[q]:lims[q + 1]]
+                top = np.argsort(-scores)[:k]
+                per_query.append((scores[top], indices[top]))
+        else:
+            all_scores, all_indices = self.index.search(queries, k)
+            per_query = list(zip(all_scores, all_indices))
+        
+        return [self._to_results(scores, indices) for scores, indices in per_query]
+    
+    def vectors(self, results: List[Dict]) -> np.ndarray:
+        """
+        Stored vectors of search results (by their 'id'), one row each.
+        Read back from the flat index, no copy of the vectors is kept.
+        """
+        ids = np.array([r['id'] for r in results], dtype='int64')
+        if not len(ids):
+            return np.zeros((0, self.dimension), dtype='float32')
+        return self.index.reconstruct_batch(ids)
+    
+    def _to_results(self, scores: np.ndarray, indices: np.ndarray) -> List[Dict]:
+        """Attach scores and IDs to copies of the matching documents."""
         results = []
-        for i, idx in enumerate(indices[0]):
-            if idx < len(self.documents):
+        for i, idx in enumerate(indices):
+            if 0 <= idx < len(self.documents):
                 doc = self.documents[idx].copy()
-                doc['score'] = float(distances[0][i])
+                doc['score'] = float(scores[i])
+                doc['id'] = int(idx)
                 results.append(doc)
         
         return results
     
+    def _search_index(
+        self,
+        index,
+        query: np.ndarray,
+        k: int,
+        min_score: float = None,
+        params=None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k search on one FAISS index.
+        
+        Returns:
+            (scores, positions) best first
+        """
+        if min_score is not None and self.metric == "cosine":
+            # Only vectors above the bound come back from FAISS
+            _, scores, indices = index.range_search(query, min_score, params=params)
+            top = np.argsort(-scores)[:k]
+            return scores[top], indices[top]
+        
+        scores, indices = index.search(query, k, params=params)
+        return scores[0], indices[0]
+    
+    def _filtered_search(
+        self,
+        query: np.ndarray,
+        k: int,
+        min_score: Optional[float],
+        subject: Optional[str],
+        sources: Optional[List[str]],
+        page_range: Optional[Tuple[int, int]]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Search only the partitions of matching sources.
+        Cost depends on the size of the selection, not the corpus.
+        """
+        all_scores, all_ids = [], []
+        
+        for source in self.metadata.resolve_sources(subject, sources):
+            index, ids, pages = self._partition(source)
+            
+            params = None
+            if page_range is not None:
+                lo, hi = page_bounds(pages, page_range)
+                if lo >= hi:
+                    continue
+                # Partition rows are sorted by page: one contiguous range
+                params = faiss.SearchParameters(sel=faiss.IDSelectorRange(lo, hi))
+            
+            scores, positions = self._search_index(index, query, k, min_score, params)
+            valid = positions >= 0
+            all_scores.append(scores[valid])
+            all_ids.append(ids[positions[valid]])
+        
+        if not all_scores:
+            return np.zeros(0, dtype='float32'), np.zeros(0, dtype='int64')
+        
+        # Merge partition results into a global top-k (a chunk with
+        # several matching copies counts once)
+        scores = np.concatenate(all_scores)
+        ids = np.concatenate(all_ids)
+        order = np.argsort(-scores if self.metric == "cosine" else scores, kind='stable')
+        _, first = np.unique(ids[order], return_index=True)
+        order = order[np.sort(first)][:k]
+        return scores[order], ids[order]
+    
+    def _partition(self, source: str):
+        """
+        Sub-index for one source, rows sorted by page.
+        
+        Returns:
+            (faiss index, global IDs, pages) aligned by row
+        """
+        partition = self._partitions.get(source)
+        if partition is not None:
+            return partition
+        
+        with self._partitions_lock:
+            if source not in self._partitions:
+                # One row per copy of a chunk in this source (dedup
+                # provenance), at the page of that copy
+                rows = sorted(
+                    (page, int(i))
+                    for i in self.metadata.ids_for_source(source)
+                    for copy_source, page in locations(self.documents[i])
+                    if copy_source == source
+                )
+                pages = np.array([page for page, _ in rows], dtype='int64')
+                ids = np.array([i for _, i in rows], dtype='int64')
+                
+                # Vectors are already normalized in cosine mode
+                index = self._new_index(self.dimension, self.metric)
+                if len(ids):
+                    index.add(self.index.reconstruct_batch(ids))
+                self._partitions[source] = (index, ids, pages)
+            
+            return self._partitions[source]
+    
     def save(self, directory: str = "data/processed"):
         """Save vector store to disk."""
         Path(directory).mkdir(parents=True, exist_ok=True)
@@ -60,24 +288,76 @@ class VectorStore:
         # Save FAISS index
         faiss.write_index(self.index, f"{directory}/faiss.index")
         
-        # Save documents
-        with open(f"{directory}/documents.pkl", 'wb') as f:
-            pickle.dump(self.documents, f)
+        # Save documents (columnar, no pickle - see document_store.py)
+        save_documents(self.documents, directory)
+        remove_legacy(directory)
+        
+        # Save metric (older stores without this file are L2)
+        with open(f"{directory}/store_config.json", 'w') as f:
+            json.dump({'metric': self.metric, 'dimension': self.dimension}, f)
         
-        print(f"💾 Vector store saved to {directory}/")
+        # Save source -> ID ranges for filtered search
+        self.metadata.save(f"{directory}/metadata_index.json")
+        
+        logger.info(f"💾 Vector store saved to {directory}/")
     
     def load(self, directory: str = "data/processed"):
         """Load vector store from disk."""
         self.index = faiss.read_index(f"{directory}/faiss.index")
+        self.dimension = self.index.d
+        
+        config_path = Path(directory) / "store_config.json"
+        if config_path.exists():
+            with open(config_path) as f:
+                self.metric = json.load(f)['metric']
+        else:
+            self.metric = "l2"
         
-        with open(f"{directory}/documents.pkl", 'rb') as f:
-            self.documents = pickle.load(f)
+        self.documents = load_documents(directory)
         
-        print(f"📂 Loaded {self.index.ntotal} documents from {directory}/")
+        # Older stores have no metadata index: build it from documents
+        metadata_path = Path(directory) / "metadata_index.json"
+        if metadata_path.exists():
+            self._reset_metadata(MetadataIndex.load(str(metadata_path)))
+        else:
+            self._reset_metadata()
+        
+        logger.info(f"📂 Loaded {self.index.ntotal} documents from {directory}/ ({self.metric})")
+
+
+def migrate_to_cosine(directory: str = "data/processed"):
+    """
+    Convert a saved L2 store to cosine (inner product) as a new snapshot.
+    Vectors are reconstructed from the flat index and normalized,
+    so nothing needs to be re-embedded. The live version stays untouched
+    until the converted one is published (see snapshots.publish_snapshot).
+    """
+    store = VectorStore()
+    store.load(str(resolve_store_dir(directory)))
+    
+    if store.metric == "cosine":
+        logger.info("✅ Store already uses cosine similarity")
+        return
+    
+    vectors = store.index.reconstruct_n(0, store.index.ntotal)
+    
+    store.metric = "cosine"
+    store.index = VectorStore._new_index(store.dimension, "cosine")
+    store.index.add(store._prepare(vectors))
+    publish_snapshot(directory, store.save)
+    
+    logger.info(f"✅ Migrated {store.index.ntotal} vectors to cosine similarity")
 
 
 # TEST
 if __name__ == "__main__":
+    import sys
+    
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate":
+        # Convert existing L2 index to cosine
+        migrate_to_cosine()
+        sys.exit(0)
+    
     print("🧪 TESTING VECTOR STORE\n")
     
     from embedder import Embedder
@@ -94,7 +374,7 @@ if __name__ == "__main__":
     embeddings = embedder.embed_documents(texts)
     
     # Build vector store
-    store = VectorStore()
+    store = VectorStore(metric="cosine")
     store.add_documents(embeddings, docs)
     
     # Test search